@@ -3,20 +3,31 @@
 
 __version__ = "0.3.0"
 
-import json
+import atexit
+import base64
+import hashlib
 import logging
+import multiprocessing
 import os
 import re
 import shutil
+import signal
 import sys
 import tempfile
+import threading
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field, fields, replace
 from pathlib import Path
 from urllib.parse import urlparse, unquote, quote
 
 import click
-import html2text
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup, Comment, Tag
 from dotenv import load_dotenv
 
@@ -86,6 +97,20 @@ EXIT_FAILURE = 2
 EXIT_CONFIG = 3
 EXIT_AUTH = 4
 
+# ---------------------------------------------------------------------------
+# File types
+# ---------------------------------------------------------------------------
+
+IMAGE_EXTS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".svg", ".bmp", ".webp", ".ico"})
+
+
+def file_ext(name):
+    """Lower-cased extension of a file name, as Path(name).suffix gives but without a Path."""
+    name = name.rpartition("/")[2]
+    i = name.rfind(".")
+    return name[i:].lower() if 0 < i < len(name) - 1 else ""
+
+
 # ---------------------------------------------------------------------------
 # MigrationState
 # ---------------------------------------------------------------------------
@@ -93,74 +118,340 @@ EXIT_AUTH = 4
 STATE_FILE = ".migration-state.json"
 
 
+@dataclass(slots=True)
+class PageRecord:
+    """One page's migration state.
+
+    Slotted, so a large migration doesn't hold a hash table per page. Records
+    still support the item access (rec["status"], rec.get(), rec.update()) the
+    pipeline uses, and orjson serializes them like the dicts they replace.
+    """
+
+    page_id: str
+    title: str
+    space_key: str
+    space_id: str | None = None
+    parent_id: str | None = None
+    has_children: bool = False
+    status: str = "pending"
+    export_path: str | None = None
+    convert_path: str | None = None
+    upload_path: str | None = None
+    error: str | None = None
+    attachments: list = field(default_factory=list)
+    comments: list = field(default_factory=list)
+    version: int | None = None
+    etag: str | None = None
+    content_hash: str | None = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from its JSON form; keys this version doesn't know are dropped."""
+        return cls(**{k: v for k, v in data.items() if k in _PAGE_RECORD_FIELDS})
+
+    def to_dict(self):
+        return asdict(self)
+
+    def __getitem__(self, key):
+        if key not in _PAGE_RECORD_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _PAGE_RECORD_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        """True if the field holds a value; unset (None) fields count as absent."""
+        return key in _PAGE_RECORD_FIELDS and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _PAGE_RECORD_FIELDS else default
+
+    def update(self, **changes):
+        for key, value in changes.items():
+            self[key] = value
+
+
+_PAGE_RECORD_FIELDS = frozenset(f.name for f in fields(PageRecord))
+
+
 class MigrationState:
-    """Persistent per-page migration state backed by JSON file."""
+    """Persistent per-page migration state backed by JSON file.
+
+    Writes are batched: set_page() persists at most every FLUSH_INTERVAL seconds
+    or FLUSH_EVERY changes, and not at all inside a bulk() block. Call flush() to
+    force pending changes to disk; it also runs at interpreter exit. With
+    autosave=False only flush() (or leaving a bulk() block) writes the file.
+    """
+
+    FLUSH_INTERVAL = 2.0  # seconds
+    FLUSH_EVERY = 50  # pending changes
 
-    def __init__(self, path=None):
+    def __init__(self, path=None, autosave=True):
         self.path = Path(path if path is not None else STATE_FILE)
+        self.autosave = autosave
         self.pages = {}
+        self._status_of = {}  # page_id → status as of the last set_page
+        self._by_status = {}  # status → {page_id: None}, an insertion-ordered set
+        self._dirty = 0
+        self._last_flush = 0.0
+        self._deferred = 0  # open bulk() blocks
+        self._lock = threading.RLock()  # set_page may be called from worker threads
+        if autosave:
+            atexit.register(self.flush)
 
     def load(self):
         if self.path.exists():
-            self.pages = json.loads(self.path.read_text(encoding="utf-8"))
+            self.pages = {pid: PageRecord.from_dict(p)
+                          for pid, p in orjson.loads(self.path.read_bytes()).items()}
+        self._status_of = {}
+        self._by_status = {}
+        for pid, p in self.pages.items():
+            self._index(pid, p)
         return self
 
+    def _index(self, page_id, data):
+        """Move page_id into the bucket of its current status.
+
+        Callers mutate records in place before set_page(), so the previous status
+        is taken from _status_of, not from the record.
+        """
+        status = data.get("status", "unknown")
+        old = self._status_of.get(page_id)
+        if old == status:
+            return
+        if old is not None:
+            bucket = self._by_status[old]
+            del bucket[page_id]
+            if not bucket:
+                del self._by_status[old]
+        self._status_of[page_id] = status
+        self._by_status.setdefault(status, {})[page_id] = None
+
     def save(self):
-        tmp = self.path.with_suffix(".tmp")
-        tmp.write_text(json.dumps(self.pages, indent=2, ensure_ascii=False), encoding="utf-8")
-        tmp.replace(self.path)
+        """Atomically write state: temp file → fsync → rename over the target."""
+        with self._lock:
+            payload = orjson.dumps(self.pages, option=orjson.OPT_INDENT_2)
+            tmp = self.path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                try:
+                    # One write() for the whole payload; loop only on a short write
+                    view = memoryview(payload)
+                    while view:
+                        view = view[os.write(fd, view):]
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                os.replace(tmp, self.path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)  # e.g. disk full: keep the last good state only
+                raise
+            self._dirty = 0
+            self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Persist any pending changes."""
+        with self._lock:
+            if self._dirty:
+                self.save()
+
+    @contextmanager
+    def bulk(self):
+        """Defer all saves until the block exits, then write once."""
+        with self._lock:
+            self._deferred += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._deferred -= 1
+                if not self._deferred:
+                    self.flush()
 
     def get_page(self, page_id):
         return self.pages.get(str(page_id))
 
     def set_page(self, page_id, data):
-        self.pages[str(page_id)] = data
-        self.save()
+        with self._lock:
+            page_id = str(page_id)
+            if isinstance(data, dict):
+                data = PageRecord.from_dict(data)
+            self.pages[page_id] = data
+            self._index(page_id, data)
+            self._dirty += 1
+            if self._deferred or not self.autosave:
+                return
+            if (self._dirty >= self.FLUSH_EVERY
+                    or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL):
+                self.save()
 
     def get_pages_by_status(self, status):
-        return {pid: p for pid, p in self.pages.items() if p.get("status") == status}
+        return {pid: self.pages[pid] for pid in self._by_status.get(status, ())}
 
     def summary(self):
-        counts = {}
-        for p in self.pages.values():
-            s = p.get("status", "unknown")
-            counts[s] = counts.get(s, 0) + 1
-        return counts
+        return {s: len(ids) for s, ids in self._by_status.items()}
 
-    @staticmethod
-    def new_page_record(page_id, title, space_key, parent_id=None, has_children=False):
+    def space_keys(self):
+        """Space ID → key mapping recorded by earlier exports."""
         return {
-            "page_id": str(page_id),
-            "title": title,
-            "space_key": space_key,
-            "parent_id": str(parent_id) if parent_id else None,
-            "has_children": has_children,
-            "status": "pending",
-            "export_path": None,
-            "convert_path": None,
-            "upload_path": None,
-            "error": None,
-            "attachments": [],
-            "comments": [],
+            p["space_id"]: p["space_key"]
+            for p in self.pages.values()
+            if p.get("space_id") and p.get("space_key")
         }
 
+    @staticmethod
+    def new_page_record(page_id, title, space_key, parent_id=None, has_children=False):
+        return PageRecord(
+            page_id=str(page_id),
+            title=title,
+            space_key=space_key,
+            parent_id=str(parent_id) if parent_id else None,
+            has_children=has_children,
+        )
+
 
 # ---------------------------------------------------------------------------
 # ConfluenceClient
 # ---------------------------------------------------------------------------
 
 
+class _RateLimiter:
+    """Sliding-window requests-per-minute limiter shared by all client threads."""
+
+    WINDOW = 60  # seconds
+
+    def __init__(self, rpm):
+        self.rpm = max(1, int(rpm))
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def wait_if_throttled(self):
+        """Block until one more request fits into the current window."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.WINDOW:
+                    self._calls.popleft()
+                if len(self._calls) < self.rpm:
+                    self._calls.append(now)
+                    return
+                delay = self.WINDOW - (now - self._calls[0])
+            log.debug("Rate limit of %d rpm reached — waiting %.1fs", self.rpm, delay)
+            time.sleep(delay)
+
+    def observe(self, headers):
+        """Pause proactively when the server reports less than 10% of its quota left."""
+        try:
+            remaining = int(headers.get("X-RateLimit-Remaining"))
+            limit = int(headers.get("X-RateLimit-Limit"))
+        except (TypeError, ValueError):
+            return
+        if limit <= 0 or remaining >= limit * 0.1:
+            return
+        try:
+            delay = float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            delay = self.WINDOW / self.rpm
+        log.debug("Rate limit nearly exhausted (%d/%d left) — pausing %.1fs", remaining, limit, delay)
+        time.sleep(delay)
+
+
+class _AdaptiveConcurrency:
+    """AIMD admission control for in-flight requests.
+
+    Adds a permit after each window of healthy latencies and halves the permits
+    on 429/5xx or slow windows, so parallelism settles at what the API sustains.
+    """
+
+    ALPHA = 1
+    BETA = 0.5
+    WINDOW = 20  # completed requests per latency decision
+    TARGET_LATENCY = 0.5  # seconds
+
+    def __init__(self, initial=8, minimum=2, maximum=32):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self._in_flight = 0
+        self._latencies = deque(maxlen=self.WINDOW)
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency, throttled=False):
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self._decrease()
+            else:
+                self._latencies.append(latency)
+                if len(self._latencies) == self.WINDOW:
+                    if sum(self._latencies) / self.WINDOW <= self.TARGET_LATENCY:
+                        self.limit = min(self.maximum, self.limit + self.ALPHA)
+                    else:
+                        self._decrease()
+                    self._latencies.clear()
+            self._cond.notify_all()
+
+    def _decrease(self):
+        self.limit = max(self.minimum, int(self.limit * self.BETA))
+        self._latencies.clear()
+        log.debug("Reducing Confluence concurrency to %d", self.limit)
+
+
+class _PrecomputedBasicAuth(requests.auth.AuthBase):
+    """Basic auth encoded once, instead of per request as HTTPBasicAuth does.
+
+    Being a session auth (not a default header) keeps requests' behaviour of
+    skipping .netrc lookups and dropping credentials on cross-host redirects.
+    """
+
+    def __init__(self, username, password):
+        token = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("ascii")
+        self._header = f"Basic {token}"
+
+    def __call__(self, r):
+        r.headers["Authorization"] = self._header
+        return r
+
+
 class ConfluenceClient:
     """Confluence Cloud REST API v2 client."""
 
     MAX_RETRIES = 5
     INITIAL_BACKOFF = 1  # seconds
+    MAX_WORKERS = 32  # thread ceiling; _AdaptiveConcurrency gates actual in-flight requests
+    DEFAULT_RPM = 100  # requests per minute, override with CONFLUENCE_RPM
+    TIMEOUT = (10, 60)  # connect, read seconds
 
-    def __init__(self, base_url, username, api_token):
+    def __init__(self, base_url, username, api_token, rpm=None):
         self.base_url = base_url.rstrip("/")
         self.session = requests.Session()
-        self.session.auth = (username, api_token)
+        self.session.auth = _PrecomputedBasicAuth(username, api_token)
         self.session.headers.update({"Accept": "application/json"})
+        # One keep-alive pool sized to the worker ceiling, so concurrent fetches reuse
+        # connections instead of opening (and discarding) extra sockets.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_WORKERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.concurrency = _AdaptiveConcurrency(maximum=self.MAX_WORKERS)
+        if rpm is None:
+            rpm = os.getenv("CONFLUENCE_RPM") or self.DEFAULT_RPM
+            try:
+                rpm = int(rpm)
+            except ValueError:
+                raise click.ClickException(
+                    f"CONFLUENCE_RPM must be a whole number of requests per minute, got {rpm!r}"
+                ) from None
+        self.rate_limiter = _RateLimiter(rpm)
+        self._space_keys = {}  # space ID → key
 
     # -- low-level --------------------------------------------------------
 
@@ -168,20 +459,31 @@ class ConfluenceClient:
         """Make an HTTP request with retry + backoff on 429/5xx."""
         if not url.startswith("http"):
             url = f"{self.base_url}{url}"
+        kwargs.setdefault("timeout", self.TIMEOUT)
 
         backoff = self.INITIAL_BACKOFF
         for attempt in range(1, self.MAX_RETRIES + 1):
+            self.rate_limiter.wait_if_throttled()
             log.debug("%s %s (attempt %d)", method, url, attempt)
-            resp = self.session.request(method, url, **kwargs)
+            self.concurrency.acquire()
+            started = time.monotonic()
+            throttled = True  # connection errors back off like a 5xx
+            try:
+                resp = self.session.request(method, url, **kwargs)
+                throttled = resp.status_code == 429 or resp.status_code >= 500
+            finally:
+                self.concurrency.release(time.monotonic() - started, throttled)
 
             if resp.status_code == 429 or resp.status_code >= 500:
                 retry_after = int(resp.headers.get("Retry-After", backoff))
                 log.warning("HTTP %d on %s — retrying in %ds", resp.status_code, url, retry_after)
+                resp.close()  # release the connection of a streamed response
                 time.sleep(retry_after)
                 backoff = min(backoff * 2, 32)
                 continue
 
             resp.raise_for_status()
+            self.rate_limiter.observe(resp.headers)
             return resp
 
         resp.raise_for_status()
@@ -198,6 +500,10 @@ class ConfluenceClient:
             yield from data.get("results", [])
             url = data.get("_links", {}).get("next")
 
+    def close(self):
+        """Close the pooled keep-alive connections."""
+        self.session.close()
+
     # -- auth -------------------------------------------------------------
 
     def verify_auth(self):
@@ -218,15 +524,59 @@ class ConfluenceClient:
         results = data.get("results", [])
         if not results:
             raise click.ClickException(f"Space '{key}' not found.")
+        self.remember_space_keys({results[0]["id"]: results[0]["key"]})
         return results[0]
 
     def get_all_spaces(self):
-        return list(self._paginate("/wiki/api/v2/spaces"))
+        spaces = list(self._paginate("/wiki/api/v2/spaces"))
+        self.remember_space_keys({s["id"]: s["key"] for s in spaces})
+        return spaces
+
+    def remember_space_keys(self, mapping):
+        """Seed the space ID → key cache, e.g. from MigrationState.space_keys()."""
+        self._space_keys.update({str(k): v for k, v in mapping.items()})
+
+    def get_space_key(self, space_id):
+        """Resolve a space ID to its key, caching successful lookups.
+
+        Falls back to the ID itself if the lookup fails (not cached, so a later
+        call can retry).
+        """
+        space_id = str(space_id)
+        key = self._space_keys.get(space_id)
+        if key is not None:
+            return key
+        try:
+            key = self._get_json(f"/wiki/api/v2/spaces/{space_id}").get("key", space_id)
+        except Exception as e:
+            log.debug("Could not resolve space %s: %s", space_id, e)
+            return space_id
+        self._space_keys[space_id] = key
+        return key
+
+    def get_space_keys(self, space_ids):
+        """Resolve several space IDs at once, returning ``{space_id: key}`` in input order.
+
+        Uncached IDs are looked up concurrently; duplicates are resolved once.
+        """
+        unique = list(dict.fromkeys(str(sid) for sid in space_ids))
+        missing = [sid for sid in unique if sid not in self._space_keys]
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(missing))) as ex:
+                resolved = dict(zip(missing, ex.map(self.get_space_key, missing)))
+        else:
+            resolved = {sid: self.get_space_key(sid) for sid in missing}
+        return {sid: self._space_keys.get(sid) or resolved[sid] for sid in unique}
 
     # -- pages ------------------------------------------------------------
 
-    def get_space_pages(self, space_id):
-        """Get all pages in a space. Lists pages first, then fetches each with export_view body."""
+    def get_space_pages(self, space_id, etags=None):
+        """Get all pages in a space. Lists pages first, then fetches each with export_view body.
+
+        ``etags`` (page_id → ETag from a previous export) makes body fetches conditional;
+        pages the server reports unchanged are returned as their list entry with
+        ``"not_modified": True`` instead of a full body.
+        """
         # v2 API doesn't support body-format on list endpoint — list first, fetch individually
         page_list = list(
             self._paginate(
@@ -235,25 +585,45 @@ class ConfluenceClient:
             )
         )
         log.info("Found %d pages in space, fetching bodies...", len(page_list))
-        pages = []
-        for i, p in enumerate(page_list, 1):
-            log.debug("Fetching page %d/%d: %s", i, len(page_list), p.get("title", "?"))
-            full = self.get_page(p["id"])
-            pages.append(full)
-        return pages
+        fetched = self._get_pages_parallel([p["id"] for p in page_list], etags)
+        return [
+            pg if pg is not None else {**listed, "not_modified": True}
+            for listed, pg in zip(page_list, fetched)
+        ]
 
-    def get_page(self, page_id):
-        return self._get_json(
-            f"/wiki/api/v2/pages/{page_id}",
-            **{"body-format": "export_view"},
+    def get_page(self, page_id, etag=None):
+        """Fetch a page with its export_view body.
+
+        With ``etag``, the GET is conditional and None is returned on 304 Not Modified.
+        The response ETag is kept on the returned page as ``"etag"``.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        resp = self._request(
+            "GET", f"/wiki/api/v2/pages/{page_id}",
+            params={"body-format": "export_view"}, headers=headers,
         )
+        if resp.status_code == 304:
+            log.debug("Page %s not modified", page_id)
+            return None
+        data = resp.json()
+        data["etag"] = resp.headers.get("ETag")
+        return data
 
     def get_pages_by_ids(self, page_ids):
         """Fetch multiple pages by ID."""
-        pages = []
-        for pid in page_ids:
-            pages.append(self.get_page(pid))
-        return pages
+        return self._get_pages_parallel(page_ids)
+
+    def _get_pages_parallel(self, page_ids, etags=None):
+        """Fetch page bodies concurrently over the shared session, preserving input order."""
+        etags = etags or {}
+
+        def fetch(pid):
+            return self.get_page(pid, etags.get(str(pid)))
+
+        if len(page_ids) <= 1:
+            return [fetch(pid) for pid in page_ids]
+        with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(page_ids))) as ex:
+            return list(ex.map(fetch, page_ids))
 
     def get_page_children(self, page_id):
         """Get direct children of a page."""
@@ -274,12 +644,60 @@ class ConfluenceClient:
     def get_page_attachments(self, page_id):
         return list(self._paginate(f"/wiki/api/v2/pages/{page_id}/attachments"))
 
-    def download_attachment(self, download_url):
-        """Download attachment binary. Prepends /wiki to relative URLs."""
+    DOWNLOAD_CHUNK_SIZE = 1 << 20  # bytes held in memory per in-flight download
+
+    def download_attachment(self, download_url, dest_path):
+        """Stream attachment binary to dest_path. Prepends /wiki to relative URLs.
+
+        The body goes to a sibling temp file that is renamed over dest_path, so an
+        existing file there is never rewritten in place: the convert step hardlinks
+        exported attachments, and those links must keep the old bytes.
+
+        Returns the number of bytes written.
+        """
         if download_url.startswith("/download/") or download_url.startswith("/rest/"):
             download_url = f"/wiki{download_url}"
-        resp = self._request("GET", download_url)
-        return resp.content
+        resp = self._request("GET", download_url, stream=True)
+        dest_path = Path(dest_path)
+        tmp = dest_path.with_name(dest_path.name + ".part")
+        size = 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, dest_path)
+        except Exception:
+            tmp.unlink(missing_ok=True)  # don't leave a truncated file behind
+            raise
+        finally:
+            resp.close()
+        return size
+
+    # -- bulk listings ----------------------------------------------------
+
+    BULK_LIMIT = 250  # max page size of the site-wide listing endpoints
+
+    def get_all_footer_comments(self):
+        """Top-level footer comments of every page on the site, as {page_id: [comments]}.
+
+        Replies (those with a parentCommentId) are dropped, matching the per-page endpoint.
+        """
+        by_page = {}
+        for c in self._paginate(
+            "/wiki/api/v2/footer-comments", limit=self.BULK_LIMIT, **{"body-format": "storage"}
+        ):
+            if c.get("pageId") and not c.get("parentCommentId"):
+                by_page.setdefault(str(c["pageId"]), []).append(c)
+        return by_page
+
+    def get_all_attachments(self):
+        """Attachments of every page on the site, as {page_id: [attachments]}."""
+        by_page = {}
+        for att in self._paginate("/wiki/api/v2/attachments", limit=self.BULK_LIMIT):
+            if att.get("pageId"):
+                by_page.setdefault(str(att["pageId"]), []).append(att)
+        return by_page
 
 
 # ---------------------------------------------------------------------------
@@ -287,41 +705,127 @@ class ConfluenceClient:
 # ---------------------------------------------------------------------------
 
 
+def _fast_copy(src, dest):
+    """Hardlink src to dest (no bytes copied); fall back to a real copy across filesystems.
+
+    The fallback is ``shutil.copyfile``, which copies in-kernel (sendfile/copy_file_range
+    on Linux) and skips the metadata syscalls ``copy2`` adds.
+    """
+    try:
+        os.unlink(dest)  # re-runs: replace, and never copy a hardlink onto itself
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+# html2text settings applied to every instance. Instances keep parser state between
+# handle() calls, so they're per-thread and shared by all Converters on that thread;
+# copying a configured instance instead would share its mutable internal lists.
+_H2T_OPTIONS = {
+    "body_width": 0,
+    "protect_links": True,
+    "unicode_snob": True,
+    "wrap_links": False,
+    "wrap_list_items": False,
+    "pad_tables": True,
+}
+_h2t_local = threading.local()
+
+
+def _thread_html2text():
+    """Return this thread's configured HTML2Text instance."""
+    h2t = getattr(_h2t_local, "h2t", None)
+    if h2t is None:
+        import html2text  # only conversion needs it; export/upload/status runs skip the import
+
+        h2t = html2text.HTML2Text()
+        for name, value in _H2T_OPTIONS.items():
+            setattr(h2t, name, value)
+        _h2t_local.h2t = h2t
+    return h2t
+
+
 class Converter:
     """Convert Confluence export_view HTML to Markdown."""
 
-    UNSAFE_FILENAME_RE = re.compile(r'[/\\:*?"<>|]')
+    UNSAFE_FILENAME_TABLE = str.maketrans("", "", '/\\:*?"<>|')
+    HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+    # Div macros whose classes contain these (as substrings, e.g. "code-block-wrapper")
+    # are left to their own passes, not commented out
+    HANDLED_MACRO_CLASSES = ("confluence-information-macro", "code-block")
 
     def __init__(self, exclude_images=False, exclude_attachments=False):
         self.exclude_images = exclude_images
         self.exclude_attachments = exclude_attachments
-        self._h2t = html2text.HTML2Text()
-        self._h2t.body_width = 0
-        self._h2t.protect_links = True
-        self._h2t.unicode_snob = True
-        self._h2t.wrap_links = False
-        self._h2t.wrap_list_items = False
-        self._h2t.pad_tables = True
+
+    def _get_h2t(self):
+        return _thread_html2text()
 
     # -- preprocessing ----------------------------------------------------
 
+    @staticmethod
+    def _live(elements):
+        """Skip elements destroyed by an earlier pass (e.g. inside a decomposed block)."""
+        return (el for el in elements if not el.decomposed)
+
+    def _collect_targets(self, soup):
+        """Walk the tree once, bucketing the elements each preprocessing pass rewrites.
+
+        Buckets keep document order, matching what per-pass find_all() calls returned.
+        """
+        targets = {
+            "attachments_ui": [], "cells": [], "panels": [], "code_blocks": [],
+            "macros": [], "mentions": [], "images": [],
+        }
+        for el in soup.find_all(True):
+            name = el.name
+            if name in ("th", "td"):
+                targets["cells"].append(el)
+            elif name == "img":
+                targets["images"].append(el)
+            elif name == "a":
+                if "confluence-userlink" in (el.get("class") or ()):
+                    targets["mentions"].append(el)
+            elif name in ("ac:structured-macro", "structured-macro"):
+                # lxml keeps the "ac:" prefix on tag/attribute names; match the bare
+                # name too in case a libxml2 build strips it.
+                targets["macros"].append(el)
+            elif name == "div":
+                classes = el.get("class") or ()
+                joined = " ".join(classes)
+                if "plugin_attachments_container" in classes:
+                    targets["attachments_ui"].append(el)
+                if "confluence-information-macro" in joined:
+                    targets["panels"].append(el)
+                if "code-block" in classes:
+                    targets["code_blocks"].append(el)
+                if el.has_attr("data-macro-name") and not any(
+                        c in joined for c in self.HANDLED_MACRO_CLASSES):
+                    targets["macros"].append(el)
+        return targets
+
     def preprocess_html(self, html, attachment_names=None):
         """Clean Confluence HTML before markdown conversion."""
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, "lxml")
+        targets = self._collect_targets(soup)
+        live = self._live
 
         # Remove attachment management UI + preceding "Attachments" heading
-        for el in soup.select("div.plugin_attachments_container"):
+        for el in live(targets["attachments_ui"]):
             prev = el.previous_sibling
             # Walk back over whitespace NavigableStrings
             while prev and not isinstance(prev, Tag):
                 prev = prev.previous_sibling
-            if prev and prev.name in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            if prev and prev.name in self.HEADING_TAGS:
                 if "attachment" in prev.get_text(strip=True).lower():
                     prev.decompose()
             el.decompose()
 
         # Tables: expand colspan into duplicate cells so markdown column count is correct
-        for cell in soup.find_all(["th", "td"]):
+        for cell in live(targets["cells"]):
             span = int(cell.get("colspan", 1))
             if span > 1:
                 del cell["colspan"]
@@ -331,9 +835,11 @@ class Converter:
 
         # Tables: flatten block elements inside cells so html2text keeps table intact
         for tag_name in ("th", "td"):
-            for cell in soup.find_all(tag_name):
+            for cell in live(targets["cells"]):
+                if cell.name != tag_name:
+                    continue
                 # Replace headings with <strong>
-                for heading in cell.find_all(re.compile(r"^h[1-6]$")):
+                for heading in cell.find_all(self.HEADING_TAGS):
                     strong = soup.new_tag("strong")
                     strong.string = heading.get_text()
                     heading.replace_with(strong)
@@ -373,7 +879,7 @@ class Converter:
                         cell.insert(0, " — ".join(parts))
 
         # Info / warning / note panels → blockquotes
-        for panel in soup.find_all("div", class_=re.compile(r"(confluence-information-macro)")):
+        for panel in live(targets["panels"]):
             macro_type = "Note"
             classes = panel.get("class", [])
             for cls in classes:
@@ -386,7 +892,7 @@ class Converter:
                 elif "info" in cls:
                     macro_type = "Info"
             body = panel.find("div", class_="confluence-information-macro-body")
-            if body:
+            if body and panel.parent is not None:
                 bq = soup.new_tag("blockquote")
                 prefix = soup.new_tag("strong")
                 prefix.string = f"{macro_type}: "
@@ -396,46 +902,40 @@ class Converter:
                 panel.replace_with(bq)
 
         # Code blocks — preserve language hints
-        for code_macro in soup.find_all("div", class_="code-block"):
+        for code_macro in live(targets["code_blocks"]):
             lang = code_macro.get("data-language", "")
             pre = code_macro.find("pre")
-            if pre:
+            if pre and code_macro.parent is not None:
                 new_pre = soup.new_tag("pre")
                 code_tag = soup.new_tag("code", attrs={"class": f"language-{lang}"} if lang else {})
                 code_tag.string = pre.get_text()
                 new_pre.append(code_tag)
                 code_macro.replace_with(new_pre)
 
-        # ac:structured-macro and data-macro-name → HTML comments
-        for macro in soup.find_all("ac:structured-macro"):
-            name = macro.get("ac:name", "unknown")
-            macro.replace_with(Comment(f" Unsupported macro: {name} "))
-
-        for macro in soup.find_all("div", attrs={"data-macro-name": True}):
-            # Skip already-handled panels and code blocks
-            if macro.get("class") and any(
-                "confluence-information-macro" in c or "code-block" in c
-                for c in macro.get("class", [])
-            ):
+        # ac:structured-macro and data-macro-name → HTML comments (panels and code
+        # blocks were excluded when collecting)
+        for macro in live(targets["macros"]):
+            if macro.parent is None:
                 continue
-            name = macro.get("data-macro-name", "unknown")
+            if macro.name == "div":
+                name = macro.get("data-macro-name", "unknown")
+            else:
+                name = macro.get("ac:name") or macro.get("name", "unknown")
             macro.replace_with(Comment(f" Unsupported macro: {name} "))
 
         # User mentions → @DisplayName
-        for mention in soup.find_all("a", class_="confluence-userlink"):
+        for mention in live(targets["mentions"]):
             display = mention.get_text(strip=True)
-            if display:
+            if display and mention.parent is not None:
                 mention.replace_with(f"@{display}")
 
         # Rewrite image src to local filenames; remove non-image files (e.g. .mp4)
-        image_exts = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".bmp", ".webp", ".ico"}
         if not self.exclude_images:
-            for img in soup.find_all("img"):
+            for img in live(targets["images"]):
                 src = img.get("src", "")
                 if "/attachments/" in src or "/attachment/" in src:
                     filename = unquote(src.split("/")[-1].split("?")[0])
-                    ext = Path(filename).suffix.lower()
-                    if ext in image_exts:
+                    if file_ext(filename) in IMAGE_EXTS:
                         img["src"] = quote(filename)
                     else:
                         # Non-image (video, etc.) — remove inline embed;
@@ -444,23 +944,43 @@ class Converter:
                 elif src.startswith("data:"):
                     pass  # inline base64, leave as-is
         else:
-            for img in soup.find_all("img"):
+            for img in live(targets["images"]):
                 img.decompose()
 
-        return str(soup)
+        # lxml wraps fragments in <html><body>; drop just those two wrapper tags and
+        # keep whatever lxml put around them (<head>/<title>, leading comments)
+        html_el = soup.html
+        if html_el is None:
+            return str(soup)
+        parts = []
+        for node in soup.contents:
+            if node is not html_el:
+                parts.append(node.decode() if isinstance(node, Tag) else node.output_ready())
+                continue
+            for child in html_el.contents:
+                if child is soup.body:
+                    parts.append(child.decode_contents())
+                elif isinstance(child, Tag):
+                    parts.append(child.decode())
+                else:
+                    parts.append(child.output_ready())
+        return "".join(parts)
 
     # -- conversion -------------------------------------------------------
 
     def html_to_markdown(self, html):
         """Convert HTML to markdown via html2text."""
-        return self._h2t.handle(html).strip()
+        return self._get_h2t().handle(html).strip()
 
     def convert_page(self, page_data, attachments_dir=None):
         """Full page conversion: preprocess → markdown → comments → attachments."""
         html = page_data.get("body", "")
-        attachment_names = [a["title"] for a in page_data.get("attachments", [])]
-        processed = self.preprocess_html(html, attachment_names)
-        md = self.html_to_markdown(processed)
+        if html.strip():
+            attachment_names = [a["title"] for a in page_data.get("attachments", [])]
+            processed = self.preprocess_html(html, attachment_names)
+            md = self.html_to_markdown(processed)
+        else:
+            md = ""  # nothing to parse — skip both the bs4 and html2text passes
 
         # Append comments
         comments = page_data.get("comments", [])
@@ -508,12 +1028,10 @@ class Converter:
 
     def generate_attachment_section(self, attachments):
         """Generate ## Attachments section for non-image files."""
-        image_exts = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".bmp", ".webp", ".ico"}
         non_image = []
         for a in attachments:
             title = a.get("title", "")
-            ext = Path(title).suffix.lower()
-            if ext not in image_exts:
+            if file_ext(title) not in IMAGE_EXTS:
                 non_image.append(title)
         if not non_image:
             return ""
@@ -524,19 +1042,25 @@ class Converter:
 
     # -- filename / tree --------------------------------------------------
 
-    def sanitize_filename(self, name, existing=None):
-        """Sanitize a filename: strip unsafe chars, cap length, dedupe."""
-        name = self.UNSAFE_FILENAME_RE.sub("", name).strip()
+    def sanitize_filename(self, name, existing=None, counters=None):
+        """Sanitize a filename: strip unsafe chars, cap length, dedupe.
+
+        ``counters`` (base name → next suffix) lets callers resume dedupe where the
+        previous collision on the same base left off instead of re-probing from -2.
+        """
+        name = name.translate(self.UNSAFE_FILENAME_TABLE).strip()
         if not name:
             name = "untitled"
         if len(name) > 200:
             name = name[:200]
         if existing is not None:
             base = name
-            counter = 2
+            counter = counters.get(base, 2) if counters is not None else 2
             while name in existing:
                 name = f"{base}-{counter}"
                 counter += 1
+            if counters is not None:
+                counters[base] = counter
         return name
 
     def build_output_tree(self, state):
@@ -571,35 +1095,38 @@ class Converter:
 
         output = {}
         used_names = {}  # dir_path → set of names used
+        suffix_counters = {}  # dir_path → {base name: next dedupe suffix}
+
+        # Iterative pre-order walk (children pushed reversed so siblings pop in
+        # order); deep hierarchies can't hit the recursion limit. The homepage's
+        # children share the root dir, so visiting order must match a recursive DFS.
+        stack = [(pid, "") for pid in reversed(root_pages)]
+        while stack:
+            pid, dir_prefix = stack.pop()
+            p = pages[pid]
+            title = p.get("title", "untitled")
+            names = used_names.setdefault(dir_prefix, set())
+            counters = suffix_counters.setdefault(dir_prefix, {})
+
+            if pid == homepage_id and dir_prefix == "":
+                # Homepage → root Readme.md; its children go in root dir
+                output[pid] = {"path": "Readme.md", "dir": ""}
+                child_dir = ""
+            elif pid in has_children:
+                # Parent page → folder/Readme.md
+                folder = self.sanitize_filename(title, names, counters)
+                names.add(folder)
+                child_dir = f"{dir_prefix}/{folder}" if dir_prefix else folder
+                output[pid] = {"path": f"{child_dir}/Readme.md", "dir": child_dir}
+            else:
+                # Leaf page → title.md
+                name = self.sanitize_filename(title, names, counters)
+                names.add(name)
+                path = f"{dir_prefix}/{name}.md" if dir_prefix else f"{name}.md"
+                output[pid] = {"path": path, "dir": dir_prefix}
+                continue
 
-        def assign_paths(page_ids, dir_prefix):
-            used_names.setdefault(dir_prefix, set())
-            for pid in page_ids:
-                p = pages[pid]
-                title = p.get("title", "untitled")
-
-                if pid == homepage_id and dir_prefix == "":
-                    # Homepage → root Readme.md
-                    output[pid] = {"path": "Readme.md", "dir": ""}
-                    # Homepage children go in root dir
-                    if pid in children_map:
-                        assign_paths(children_map[pid], "")
-                elif pid in has_children:
-                    # Parent page → folder/Readme.md
-                    folder = self.sanitize_filename(title, used_names[dir_prefix])
-                    used_names[dir_prefix].add(folder)
-                    folder_path = f"{dir_prefix}/{folder}" if dir_prefix else folder
-                    output[pid] = {"path": f"{folder_path}/Readme.md", "dir": folder_path}
-                    if pid in children_map:
-                        assign_paths(children_map[pid], folder_path)
-                else:
-                    # Leaf page → title.md
-                    name = self.sanitize_filename(title, used_names[dir_prefix])
-                    used_names[dir_prefix].add(name)
-                    path = f"{dir_prefix}/{name}.md" if dir_prefix else f"{name}.md"
-                    output[pid] = {"path": path, "dir": dir_prefix}
-
-        assign_paths(root_pages, "")
+            stack.extend((cid, child_dir) for cid in reversed(children_map.get(pid, ())))
         return output
 
     def copy_attachments(self, page_data, src_dir, dest_dir):
@@ -611,24 +1138,22 @@ class Converter:
         if self.exclude_attachments:
             return copied
 
-        image_exts = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".bmp", ".webp", ".ico"}
         attachments = page_data.get("attachments", [])
 
         for a in attachments:
             title = a.get("title", "")
-            ext = Path(title).suffix.lower()
-
-            if self.exclude_images and ext in image_exts:
+            if self.exclude_images and file_ext(title) in IMAGE_EXTS:
                 continue
 
             src_file = Path(src_dir) / title
-            if src_file.exists():
-                dest_file = Path(dest_dir) / title
-                dest_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(str(src_file), str(dest_file))
-                copied.append(title)
-            else:
+            dest_file = Path(dest_dir) / title
+            dest_file.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                _fast_copy(str(src_file), str(dest_file))
+            except FileNotFoundError:
                 log.warning("Attachment file not found: %s", src_file)
+                continue
+            copied.append(title)
 
         return copied
 
@@ -641,13 +1166,30 @@ class Converter:
 class NextcloudClient:
     """Nextcloud WebDAV client for Collectives."""
 
+    POOL_SIZE = 16  # keep-alive connections kept open to the Nextcloud host
+    UPLOAD_WORKERS = 8  # concurrent PUTs in upload_many()
+    # Transport-level retries for gateway errors on idempotent requests (PUT, HEAD, ...);
+    # urllib3 rewinds streamed file bodies before resending
+    RETRY = Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504), raise_on_status=False)
+
     def __init__(self, base_url, username, password, collective):
         self.base_url = base_url.rstrip("/")
         self.username = username
         self.collective = collective
-        self.dav_base = f"{self.base_url}/remote.php/dav/files/{username}/Collectives/{collective}"
+        # Percent-encoded once here; _url() encodes only the per-request path
+        self.dav_base = f"{self.base_url}/remote.php/dav/files/{quote(username)}/Collectives/{quote(collective)}"
         self.session = requests.Session()
         self.session.auth = (username, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE, max_retries=self.RETRY)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._mkdir_cache = set()  # remote dirs known to exist
+        self._exists_cache = set()  # remote URLs seen to exist (files or dirs)
+        self._mkdir_lock = threading.Lock()
+
+    def close(self):
+        """Close the pooled keep-alive connections."""
+        self.session.close()
 
     def verify_connection(self):
         """Verify we can reach the collective via PROPFIND."""
@@ -664,34 +1206,75 @@ class NextcloudClient:
             )
         log.info("Connected to Nextcloud collective: %s", self.collective)
 
+    def _url(self, path):
+        """WebDAV URL of a path relative to the collective."""
+        return f"{self.dav_base}/{quote(path.lstrip('/'))}"
+
     def mkdir_p(self, path):
-        """Recursively create directories via MKCOL."""
-        parts = path.strip("/").split("/")
+        """Recursively create directories via MKCOL, skipping ones already seen."""
+        parts = [quote(part) for part in path.strip("/").split("/") if part]
+        if f"{self.dav_base}/{'/'.join(parts)}" in self._mkdir_cache:
+            return
         current = self.dav_base
+        ancestors = []
         for part in parts:
-            if not part:
-                continue
             current = f"{current}/{part}"
+            if current in self._mkdir_cache:
+                ancestors.append(current)
+                continue
             resp = self.session.request("MKCOL", current)
-            if resp.status_code not in (201, 405):  # 405 = already exists
+            if resp.status_code in (201, 405):  # 405 = already exists
+                # A collection existing implies all of its parents do too
+                with self._mkdir_lock:
+                    self._mkdir_cache.add(current)
+                    self._mkdir_cache.update(ancestors)
+            else:
                 log.warning("MKCOL %s returned %d", current, resp.status_code)
+            ancestors.append(current)
 
     def upload_file(self, local_path, remote_path):
-        """Upload a file via PUT."""
-        url = f"{self.dav_base}/{remote_path.lstrip('/')}"
+        """Upload a file via PUT, streaming it from disk.
+
+        requests sends a file object in blocks rather than reading it into memory.
+        Content-Length is set from the file size so the body is never sent chunked,
+        which some WebDAV front-ends reject, and Nextcloud can pre-allocate.
+        """
+        url = self._url(remote_path)
         with open(local_path, "rb") as f:
-            resp = self.session.put(url, data=f)
+            headers = {"Content-Length": str(os.fstat(f.fileno()).st_size)}
+            resp = self.session.put(url, data=f, headers=headers)
         if resp.status_code not in (200, 201, 204):
             raise click.ClickException(
                 f"Upload failed for {remote_path}: HTTP {resp.status_code}"
             )
+        with self._mkdir_lock:
+            self._exists_cache.add(url)
         log.debug("Uploaded: %s", remote_path)
 
+    def upload_many(self, items, max_workers=None):
+        """Upload (local_path, remote_path) pairs concurrently.
+
+        Returns {remote_path: exception} for the uploads that failed; the rest
+        are left to run to completion. ``max_workers`` defaults to UPLOAD_WORKERS.
+        """
+        errors = {}
+        if not items:
+            return errors
+        workers = min(max_workers or self.UPLOAD_WORKERS, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {ex.submit(self.upload_file, str(local), remote): remote
+                       for local, remote in items}
+            for fut in as_completed(futures):
+                exc = fut.exception()
+                if exc is not None:
+                    errors[futures[fut]] = exc
+        return errors
+
     def get_file_id(self, remote_path):
         """Get Nextcloud file ID via PROPFIND."""
         import xml.etree.ElementTree as ET
 
-        url = f"{self.dav_base}/{remote_path.lstrip('/')}"
+        url = self._url(remote_path)
         body = (
             '<?xml version="1.0"?>'
             '<d:propfind xmlns:d="DAV:" xmlns:oc="http://owncloud.org/ns">'
@@ -717,10 +1300,24 @@ class NextcloudClient:
         return f"{self.base_url}/apps/files/files/{file_id}?dir={quote(dir_path)}&openfile=true"
 
     def exists(self, path):
-        """Check if a remote path exists via PROPFIND depth 0."""
-        url = f"{self.dav_base}/{path.lstrip('/')}"
-        resp = self.session.request("PROPFIND", url, headers={"Depth": "0"})
-        return resp.status_code in (200, 207)
+        """Check if a remote path exists via HEAD.
+
+        Falls back to PROPFIND depth 0 if the server won't answer HEAD for the
+        resource (some WebDAV servers refuse it on collections). Positive answers
+        are remembered, as are paths this client has uploaded or created; misses
+        are always re-checked since an upload may have landed since.
+        """
+        url = self._url(path).rstrip("/")
+        if url in self._exists_cache or url in self._mkdir_cache:
+            return True
+        resp = self.session.request("HEAD", url)
+        if resp.status_code in (405, 501):
+            resp = self.session.request("PROPFIND", url, headers={"Depth": "0"})
+        found = resp.status_code in (200, 204, 207)
+        if found:
+            with self._mkdir_lock:
+                self._exists_cache.add(url)
+        return found
 
 
 # ---------------------------------------------------------------------------
@@ -728,6 +1325,19 @@ class NextcloudClient:
 # ---------------------------------------------------------------------------
 
 
+def iter_files(root):
+    """Yield the files under root as Paths, in a deterministic (per-directory sorted) order.
+
+    os.walk's scandir already knows which entries are files, so there is no stat
+    per entry and no global sort of the whole tree.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        filenames.sort()
+        for name in filenames:
+            yield Path(dirpath, name)
+
+
 def require_env(*keys):
     """Validate required environment variables are set."""
     missing = [k for k in keys if not os.getenv(k)]
@@ -754,6 +1364,360 @@ def determine_exit_code(state):
     return EXIT_SUCCESS
 
 
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+EXPORT_WORKERS = 8  # pages exported concurrently within a space
+EXPORT_IO_WORKERS = 16  # comment fetches and attachment downloads, shared by all pages
+
+
+def _download_attachment(client, att, download_url, att_dir):
+    """Download one attachment into att_dir; returns its record (with "error" on failure)."""
+    att_title = att.get("title", "")
+    try:
+        size = client.download_attachment(download_url, att_dir / att_title)
+        log.debug("Downloaded attachment: %s", att_title)
+        return {"title": att_title, "size": size, "mediaType": att.get("mediaType", "")}
+    except Exception as e:
+        log.warning("Failed to download %s: %s", att_title, e)
+        return {"title": att_title, "error": str(e), "mediaType": att.get("mediaType", "")}
+
+
+def export_page(client, pg, space_key, export_base, has_children,
+                exclude_images=False, exclude_attachments=False, pool=None,
+                comments=None, att_list=None, previous=None):
+    """Export one page (body, comments, attachments) to disk.
+
+    With ``pool`` (an executor), the comments fetch and the page's attachment
+    downloads run there concurrently instead of one after another. ``comments``
+    and ``att_list``, when given (see prefetch_page_extras), replace the per-page
+    listing calls. ``previous`` is the page's existing state record: if the export
+    comes out byte-identical, the file isn't rewritten and that record is kept.
+
+    Returns the page's state record. Failures are recorded on the record
+    (status "failed") rather than raised, so one bad page never stops a space.
+    """
+    page_id = str(pg["id"])
+    title = pg.get("title", "untitled")
+    parent_id = pg.get("parentId")
+
+    log.info("Exporting page: %s (ID: %s)", title, page_id)
+
+    try:
+        # Get body HTML
+        body_html = ""
+        body = pg.get("body", {})
+        if isinstance(body, dict):
+            body_html = body.get("export_view", {}).get("value", "")
+        elif isinstance(body, str):
+            body_html = body
+
+        # Get comments (unless prefetched)
+        comments_future = None
+        if comments is None:
+            comments = []
+            if pool:
+                comments_future = pool.submit(client.get_page_comments, page_id)
+            else:
+                try:
+                    comments = client.get_page_comments(page_id)
+                except Exception as e:
+                    log.warning("Failed to fetch comments for page %s: %s", page_id, e)
+
+        # Get and download attachments
+        attachments = []
+        if not exclude_attachments:
+            try:
+                if att_list is None:
+                    att_list = client.get_page_attachments(page_id)
+                att_dir = export_base / "attachments" / page_id
+                to_download = []
+                for att in att_list:
+                    att_title = att.get("title", "")
+                    if exclude_images and file_ext(att_title) in IMAGE_EXTS:
+                        continue
+
+                    download_url = att.get("downloadLink", "")
+                    if not download_url:
+                        # Fallback: try _links.download
+                        download_url = att.get("_links", {}).get("download", "")
+
+                    if download_url:
+                        to_download.append((att, download_url))
+
+                if to_download:
+                    att_dir.mkdir(parents=True, exist_ok=True)
+                    args = [(client, att, url, att_dir) for att, url in to_download]
+                    if pool is not None and len(args) > 1:
+                        attachments = list(pool.map(_download_attachment, *zip(*args)))
+                    else:
+                        attachments = [_download_attachment(*a) for a in args]
+            except Exception as e:
+                log.warning("Failed to fetch attachments for page %s: %s", page_id, e)
+
+        if comments_future is not None:
+            try:
+                comments = comments_future.result()
+            except Exception as e:
+                log.warning("Failed to fetch comments for page %s: %s", page_id, e)
+
+        # Save page data
+        page_data = {
+            "page_id": page_id,
+            "title": title,
+            "space_key": space_key,
+            "parent_id": str(parent_id) if parent_id else None,
+            "has_children": has_children,
+            "body": body_html,
+            "comments": comments,
+            "attachments": attachments,
+        }
+
+        pages_dir = export_base / "pages"
+        export_path = pages_dir / f"{page_id}.json"
+        # orjson emits UTF-8 bytes directly: no intermediate str, no re-encode
+        payload = orjson.dumps(page_data, option=orjson.OPT_INDENT_2)
+        content_hash = hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+        if (previous and previous.get("content_hash") == content_hash
+                and previous.get("export_path") == str(export_path) and export_path.exists()):
+            if previous.get("status") in ("exported", "converted", "uploaded"):
+                # Same content as last time: keep the record, so convert/upload
+                # progress for this page stands
+                log.info("Unchanged export: %s", title)
+                return replace(previous, version=(pg.get("version") or {}).get("number"),
+                               etag=pg.get("etag"))
+        else:
+            pages_dir.mkdir(parents=True, exist_ok=True)
+            export_path.write_bytes(payload)
+
+        record = MigrationState.new_page_record(
+            page_id, title, space_key, parent_id, has_children
+        )
+        record["status"] = "exported"
+        record["export_path"] = str(export_path)
+        record["attachments"] = attachments
+        record["comments"] = [{"id": c.get("id")} for c in comments]
+        record["space_id"] = str(pg["spaceId"]) if pg.get("spaceId") else None
+        record["version"] = (pg.get("version") or {}).get("number")
+        record["etag"] = pg.get("etag")
+        record["content_hash"] = content_hash
+
+        log.info("Exported: %s (%d attachments, %d comments)", title, len(attachments), len(comments))
+        return record
+
+    except Exception as e:
+        log.error("Failed to export page %s: %s", page_id, e)
+        record = MigrationState.new_page_record(
+            page_id, title, space_key, parent_id, has_children
+        )
+        record["status"] = "failed"
+        record["error"] = str(e)
+        return record
+
+
+def load_page_export(export_path):
+    """Read an exported page file straight from bytes (no str decode, no exists() stat)."""
+    try:
+        if export_path:
+            return orjson.loads(Path(export_path).read_bytes())
+    except FileNotFoundError:
+        pass
+    raise FileNotFoundError(f"Export file not found: {export_path}")
+
+
+def known_etags(state, space_key):
+    """ETags of this space's successfully exported pages whose export file still exists."""
+    return {
+        pid: rec["etag"]
+        for status in ("exported", "converted", "uploaded")
+        for pid, rec in state.get_pages_by_status(status).items()
+        if rec.get("etag")
+        and rec.get("space_key") == space_key
+        and rec.get("export_path") and Path(rec["export_path"]).exists()
+    }
+
+
+def parent_ids(fetched_pages):
+    """IDs of the pages in ``fetched_pages`` that have at least one child among them."""
+    return ({str(p["parentId"]) for p in fetched_pages if p.get("parentId")}
+            & {str(p["id"]) for p in fetched_pages})
+
+
+def prefetch_page_extras(client, exclude_attachments=False):
+    """Bulk-list footer comments and attachments for the whole site.
+
+    Returns (comments_by_page, attachments_by_page) for export_space_pages(). A listing
+    that fails comes back as None, and pages then fall back to per-page calls.
+    """
+    comments_by_page = attachments_by_page = None
+    try:
+        comments_by_page = client.get_all_footer_comments()
+    except Exception as e:
+        log.warning("Bulk comment listing failed, fetching per page: %s", e)
+    if not exclude_attachments:
+        try:
+            attachments_by_page = client.get_all_attachments()
+        except Exception as e:
+            log.warning("Bulk attachment listing failed, fetching per page: %s", e)
+    return comments_by_page, attachments_by_page
+
+
+def export_space_pages(client, fetched_pages, space_key, state, exclude_images=False,
+                       exclude_attachments=False, skip_processed=False, prefetched=None):
+    """Export a space's pages concurrently, recording each result in state as it lands.
+
+    ``prefetched`` is the (comments_by_page, attachments_by_page) pair from
+    prefetch_page_extras(); pages absent from a bulk listing have none.
+    """
+    comments_by_page, attachments_by_page = prefetched or (None, None)
+    parent_ids_set = parent_ids(fetched_pages)
+
+    export_base = Path("export_data") / space_key
+
+    # A 304 entry carries no body, so it can only stand in for a page whose last
+    # export is on disk and whose place in the tree hasn't moved since. Anything
+    # else is fetched again in full and re-exported.
+    def reusable(pg, existing):
+        if not existing or not existing.get("export_path") or not Path(existing["export_path"]).exists():
+            return False
+        parent = pg.get("parentId")
+        return (existing.get("parent_id") == (str(parent) if parent else None)
+                and existing.get("has_children") == (str(pg["id"]) in parent_ids_set))
+
+    stale = [pg["id"] for pg in fetched_pages
+             if pg.get("not_modified") and not reusable(pg, state.get_page(pg["id"]))]
+    if stale:
+        refetched = {str(pg["id"]): pg for pg in client.get_pages_by_ids(stale)}
+        fetched_pages = [refetched.get(str(pg["id"]), pg) if pg.get("not_modified") else pg
+                         for pg in fetched_pages]
+
+    todo = []
+    for pg in fetched_pages:
+        existing = state.get_page(pg["id"])
+        if pg.get("not_modified") and existing:
+            log.info("Unchanged since last export: %s", pg.get("title", "untitled"))
+            continue
+        if skip_processed and existing and existing.get("status") in ("exported", "converted", "uploaded"):
+            log.info("Skipping already processed page: %s", pg.get("title", "untitled"))
+            continue
+        todo.append(pg)
+
+    # Comments and downloads get their own pool: page workers block on them, so
+    # sharing one pool could deadlock once every worker is waiting.
+    with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as ex, \
+            ThreadPoolExecutor(max_workers=EXPORT_IO_WORKERS) as io_pool:
+        futures = [
+            ex.submit(
+                export_page, client, pg, space_key, export_base,
+                str(pg["id"]) in parent_ids_set, exclude_images, exclude_attachments,
+                io_pool,
+                None if comments_by_page is None else comments_by_page.get(str(pg["id"]), []),
+                None if attachments_by_page is None else attachments_by_page.get(str(pg["id"]), []),
+                state.get_page(pg["id"]),
+            )
+            for pg in todo
+        ]
+        for fut in as_completed(futures):
+            record = fut.result()
+            state.set_page(record["page_id"], record)
+    state.flush()  # space boundary
+
+
+# ---------------------------------------------------------------------------
+# Convert
+# ---------------------------------------------------------------------------
+
+CONVERT_MIN_PARALLEL = 8  # fewer pages than this convert in-process; pool start-up would dominate
+_worker_converters = {}  # (exclude_images, exclude_attachments) → Converter, one set per process
+
+
+def convert_page_to_disk(pid, page_rec, path_info, convert_base, space_key,
+                         exclude_images=False, exclude_attachments=False):
+    """Convert one exported page, writing its Markdown and attachments under convert_base.
+
+    A top-level function taking plain arguments so it can run in a worker process.
+    Returns the updated record, or None when the page has no output path. Failures
+    are recorded on the record (status "failed") rather than raised.
+    """
+    flags = (exclude_images, exclude_attachments)
+    converter = _worker_converters.get(flags)
+    if converter is None:
+        converter = _worker_converters[flags] = Converter(*flags)
+
+    log.info("Converting: %s", page_rec.get("title", "?"))
+    try:
+        page_data = load_page_export(page_rec.get("export_path"))
+        if not path_info:
+            return None
+
+        convert_base = Path(convert_base)
+        output_path = convert_base / path_info["path"]
+        output_dir = convert_base / path_info["dir"] if path_info["dir"] else convert_base
+
+        md = converter.convert_page(page_data)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(md.encode("utf-8"))
+
+        att_src = Path("export_data") / space_key / "attachments" / pid
+        if att_src.exists():
+            converter.copy_attachments(page_data, att_src, output_dir)
+
+        page_rec["status"] = "converted"
+        page_rec["convert_path"] = str(output_path)
+    except Exception as e:
+        page_rec["status"] = "failed"
+        page_rec["error"] = str(e)
+    return page_rec
+
+
+def convert_pages(state, pages, tree, exclude_images=False, exclude_attachments=False,
+                  space_key=None, on_converted=None, executor=None):
+    """Convert pages on a process pool, recording each result in state as it lands.
+
+    ``space_key`` puts every page under one space's output tree; by default each
+    page uses its own. ``on_converted(pid, record)`` is called, in this thread, as
+    each page converts successfully, so a later stage can start on it right away.
+    ``executor`` is a caller-owned ProcessPoolExecutor to use instead of a fresh one.
+    """
+    jobs = []
+    for pid, page_rec in pages.items():
+        sk = space_key or page_rec.get("space_key", "default")
+        jobs.append((pid, page_rec, tree.get(pid), str(Path("convert_data") / sk), sk,
+                     exclude_images, exclude_attachments))
+
+    def record(job, rec):
+        pid, _, path_info = job[:3]
+        if rec is None:
+            log.warning("No output path computed for page %s, skipping", pid)
+        elif rec["status"] == "failed":
+            log.error("Failed to convert page %s: %s", pid, rec["error"])
+            state.set_page(pid, rec)
+        else:
+            log.info("Converted: %s → %s", rec.get("title", "?"), path_info["path"])
+            state.set_page(pid, rec)
+            if on_converted is not None:
+                on_converted(pid, rec)
+
+    # HTML → Markdown is CPU-bound, so threads would serialize on the GIL
+    if len(jobs) < CONVERT_MIN_PARALLEL:
+        for job in jobs:
+            record(job, convert_page_to_disk(*job))
+        return
+    with (nullcontext(executor) if executor is not None else ProcessPoolExecutor()) as ex:
+        futures = {ex.submit(convert_page_to_disk, *job): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                rec = fut.result()
+            except Exception as e:  # worker died or result couldn't be unpickled
+                rec = job[1]
+                rec["status"] = "failed"
+                rec["error"] = f"Conversion worker failed: {e}"
+            record(job, rec)
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -785,11 +1749,19 @@ def add_options(options):
     return decorator
 
 
+def _exit_on_sigterm(signum, frame):
+    # Default SIGTERM handling skips atexit, losing MigrationState's unflushed
+    # changes; exiting normally runs the flush (Ctrl-C already does via
+    # KeyboardInterrupt).
+    sys.exit(128 + signum)
+
+
 @click.group()
 @click.version_option(version="0.1.0")
 def cli():
     """Confluence Cloud → Nextcloud Collectives migration tool."""
-    pass
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
 
 
 # -- export ---------------------------------------------------------------
@@ -819,6 +1791,7 @@ def export(space_key, pages, all_spaces, exclude_images, exclude_attachments, dr
         raise click.ClickException(f"Authentication failed: {e}")
 
     state = MigrationState().load()
+    client.remember_space_keys(state.space_keys())
 
     # Resolve scope
     space_ids_keys = []  # list of (space_id, space_key)
@@ -826,11 +1799,7 @@ def export(space_key, pages, all_spaces, exclude_images, exclude_attachments, dr
         # Fetch individual pages, group by space
         page_ids = [p.strip() for p in pages.split(",")]
         fetched = client.get_pages_by_ids(page_ids)
-        for pg in fetched:
-            sk = pg.get("spaceId", "")
-            space_ids_keys.append((sk, pg.get("_expandable", {}).get("space", sk)))
-        # Deduplicate
-        space_ids_keys = list(set(space_ids_keys))
+        space_ids_keys = list(client.get_space_keys(pg.get("spaceId", "") for pg in fetched).items())
         all_pages = fetched
     elif all_spaces:
         spaces = client.get_all_spaces()
@@ -843,19 +1812,17 @@ def export(space_key, pages, all_spaces, exclude_images, exclude_attachments, dr
     else:
         raise click.ClickException("Specify --space, --pages, or --all-spaces.")
 
+    # With every space in scope, two site-wide listings replace two calls per page
+    prefetched = prefetch_page_extras(client, exclude_attachments) if all_spaces and not dry_run else None
+
     for space_id, sk in space_ids_keys:
         if not sk or sk == space_id:
-            # Try to resolve the space key from space_id
-            try:
-                space_data = client._get_json(f"/wiki/api/v2/spaces/{space_id}")
-                sk = space_data.get("key", str(space_id))
-            except Exception:
-                sk = str(space_id)
+            sk = client.get_space_key(space_id)
 
         log.info("Processing space: %s", sk)
 
         if all_pages is None:
-            fetched_pages = client.get_space_pages(space_id)
+            fetched_pages = client.get_space_pages(space_id, known_etags(state, sk))
         else:
             fetched_pages = [p for p in all_pages if str(p.get("spaceId")) == str(space_id)]
 
@@ -865,122 +1832,12 @@ def export(space_key, pages, all_spaces, exclude_images, exclude_attachments, dr
                 click.echo(f"  Page: {pg.get('title', '?')} (ID: {pg['id']})")
             continue
 
-        # Determine which pages have children
-        page_ids_set = {str(p["id"]) for p in fetched_pages}
-        parent_ids_set = set()
-        for p in fetched_pages:
-            pid = p.get("parentId")
-            if pid and str(pid) in page_ids_set:
-                parent_ids_set.add(str(pid))
-
-        export_base = Path("export_data") / sk
-
-        for pg in fetched_pages:
-            page_id = str(pg["id"])
-            title = pg.get("title", "untitled")
-            parent_id = pg.get("parentId")
-            has_children = page_id in parent_ids_set
-
-            log.info("Exporting page: %s (ID: %s)", title, page_id)
-
-            try:
-                # Get body HTML
-                body_html = ""
-                body = pg.get("body", {})
-                if isinstance(body, dict):
-                    body_html = body.get("export_view", {}).get("value", "")
-                elif isinstance(body, str):
-                    body_html = body
-
-                # Get comments
-                comments = []
-                try:
-                    comments = client.get_page_comments(page_id)
-                except Exception as e:
-                    log.warning("Failed to fetch comments for page %s: %s", page_id, e)
-
-                # Get and download attachments
-                attachments = []
-                if not exclude_attachments:
-                    try:
-                        att_list = client.get_page_attachments(page_id)
-                        att_dir = export_base / "attachments" / page_id
-                        for att in att_list:
-                            att_title = att.get("title", "")
-                            image_exts = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".bmp", ".webp", ".ico"}
-                            ext = Path(att_title).suffix.lower()
-
-                            if exclude_images and ext in image_exts:
-                                continue
-
-                            download_url = att.get("downloadLink", "")
-                            if not download_url:
-                                # Fallback: try _links.download
-                                download_url = att.get("_links", {}).get("download", "")
-
-                            if download_url:
-                                try:
-                                    data = client.download_attachment(download_url)
-                                    att_dir.mkdir(parents=True, exist_ok=True)
-                                    (att_dir / att_title).write_bytes(data)
-                                    attachments.append({
-                                        "title": att_title,
-                                        "size": len(data),
-                                        "mediaType": att.get("mediaType", ""),
-                                    })
-                                    log.debug("Downloaded attachment: %s", att_title)
-                                except Exception as e:
-                                    log.warning("Failed to download %s: %s", att_title, e)
-                                    attachments.append({
-                                        "title": att_title,
-                                        "error": str(e),
-                                        "mediaType": att.get("mediaType", ""),
-                                    })
-                    except Exception as e:
-                        log.warning("Failed to fetch attachments for page %s: %s", page_id, e)
-
-                # Save page data
-                page_data = {
-                    "page_id": page_id,
-                    "title": title,
-                    "space_key": sk,
-                    "parent_id": str(parent_id) if parent_id else None,
-                    "has_children": has_children,
-                    "body": body_html,
-                    "comments": comments,
-                    "attachments": attachments,
-                }
-
-                pages_dir = export_base / "pages"
-                pages_dir.mkdir(parents=True, exist_ok=True)
-                export_path = pages_dir / f"{page_id}.json"
-                export_path.write_text(
-                    json.dumps(page_data, indent=2, ensure_ascii=False),
-                    encoding="utf-8",
-                )
-
-                # Update state
-                record = MigrationState.new_page_record(
-                    page_id, title, sk, parent_id, has_children
-                )
-                record["status"] = "exported"
-                record["export_path"] = str(export_path)
-                record["attachments"] = attachments
-                record["comments"] = [{"id": c.get("id")} for c in comments]
-                state.set_page(page_id, record)
-
-                log.info("Exported: %s (%d attachments, %d comments)", title, len(attachments), len(comments))
-
-            except Exception as e:
-                log.error("Failed to export page %s: %s", page_id, e)
-                record = MigrationState.new_page_record(
-                    page_id, title, sk, parent_id, has_children
-                )
-                record["status"] = "failed"
-                record["error"] = str(e)
-                state.set_page(page_id, record)
+        export_space_pages(client, fetched_pages, sk, state, exclude_images, exclude_attachments,
+                           prefetched=prefetched)
 
+    client.close()
     if not dry_run:
+        state.flush()
         summary = state.summary()
         click.echo(f"\nExport complete: {summary}")
 
@@ -1018,54 +1875,10 @@ def convert(exclude_images, exclude_attachments, dry_run, debug, log_file):
     # Determine space key from first page
     first_page = next(iter(exported.values()))
     space_key = first_page.get("space_key", "default")
-    convert_base = Path("convert_data") / space_key
-
-    for pid, page_rec in exported.items():
-        title = page_rec.get("title", "?")
-        log.info("Converting: %s", title)
 
-        try:
-            # Load export data
-            export_path = page_rec.get("export_path")
-            if not export_path or not Path(export_path).exists():
-                raise FileNotFoundError(f"Export file not found: {export_path}")
-
-            page_data = json.loads(Path(export_path).read_text(encoding="utf-8"))
-
-            # Get output path from tree
-            path_info = tree.get(pid)
-            if not path_info:
-                log.warning("No output path computed for page %s, skipping", pid)
-                continue
-
-            output_path = convert_base / path_info["path"]
-            output_dir = convert_base / path_info["dir"] if path_info["dir"] else convert_base
-
-            # Convert to markdown
-            md = converter.convert_page(page_data)
-
-            # Write markdown
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            output_path.write_text(md, encoding="utf-8")
-
-            # Copy attachments
-            att_src = Path("export_data") / space_key / "attachments" / pid
-            if att_src.exists():
-                converter.copy_attachments(page_data, att_src, output_dir)
-
-            # Update state
-            page_rec["status"] = "converted"
-            page_rec["convert_path"] = str(output_path)
-            state.set_page(pid, page_rec)
-
-            log.info("Converted: %s → %s", title, path_info["path"])
-
-        except Exception as e:
-            log.error("Failed to convert page %s: %s", pid, e)
-            page_rec["status"] = "failed"
-            page_rec["error"] = str(e)
-            state.set_page(pid, page_rec)
+    convert_pages(state, exported, tree, exclude_images, exclude_attachments, space_key=space_key)
 
+    state.flush()
     summary = state.summary()
     click.echo(f"\nConvert complete: {summary}")
     sys.exit(determine_exit_code(state))
@@ -1124,7 +1937,7 @@ def upload(target_parent, dry_run, debug, log_file):
         raise click.ClickException(f"Convert data directory not found: {convert_base}")
 
     # Collect all files, split into attachments and markdown pages
-    all_files = sorted(f for f in convert_base.rglob("*") if f.is_file())
+    all_files = list(iter_files(convert_base))
     attachment_files = [f for f in all_files if f.suffix != ".md"]
     md_files = [f for f in all_files if f.suffix == ".md"]
 
@@ -1139,77 +1952,110 @@ def upload(target_parent, dry_run, debug, log_file):
     # Pass 1: Upload attachments and collect file IDs
     # Maps: remote_dir -> {encoded_filename: file_url}
     attachment_urls = {}
-    for local_file in attachment_files:
-        relative = local_file.relative_to(convert_base)
-        remote_path = f"{target_parent}/{relative}"
-        try:
-            nc.upload_file(str(local_file), remote_path)
+    attachment_items = [(f, f"{target_parent}/{f.relative_to(convert_base)}")
+                        for f in attachment_files]
+    upload_errors = nc.upload_many(attachment_items)
+    uploaded = []
+    for local_file, remote_path in attachment_items:
+        if remote_path in upload_errors:
+            log.error("Failed to upload attachment %s: %s", remote_path, upload_errors[remote_path])
+        else:
             log.info("Uploaded attachment: %s", remote_path)
-            file_id = nc.get_file_id(remote_path)
-            if file_id:
-                remote_dir = str(relative.parent) if str(relative.parent) != "." else ""
-                full_remote_dir = f"{target_parent}/{remote_dir}".rstrip("/")
-                encoded_name = quote(local_file.name)
-                attachment_urls.setdefault(full_remote_dir, {})[encoded_name] = \
-                    nc.file_url(file_id, full_remote_dir)
-                log.debug("File ID %s for %s", file_id, remote_path)
+            uploaded.append((local_file, remote_path))
+
+    def lookup_file_id(remote_path):
+        try:
+            return nc.get_file_id(remote_path)
         except Exception as e:
-            log.error("Failed to upload attachment %s: %s", remote_path, e)
+            log.error("Failed to look up file ID for %s: %s", remote_path, e)
+            return None
+
+    # One PROPFIND per attachment; run them over the same pooled connections
+    with ThreadPoolExecutor(max_workers=nc.UPLOAD_WORKERS) as ex:
+        file_ids = list(ex.map(lookup_file_id, [remote for _, remote in uploaded]))
+
+    for (local_file, remote_path), file_id in zip(uploaded, file_ids):
+        if file_id:
+            relative = local_file.relative_to(convert_base)
+            remote_dir = str(relative.parent) if str(relative.parent) != "." else ""
+            full_remote_dir = f"{target_parent}/{remote_dir}".rstrip("/")
+            encoded_name = quote(local_file.name)
+            attachment_urls.setdefault(full_remote_dir, {})[encoded_name] = \
+                nc.file_url(file_id, full_remote_dir)
+            log.debug("File ID %s for %s", file_id, remote_path)
 
     # Pass 2: Patch markdown with file-ID links, then upload
-    uploaded_pages = set()
-    for local_file in md_files:
+    def upload_markdown(local_file, remote_path):
         relative = local_file.relative_to(convert_base)
-        remote_path = f"{target_parent}/{relative}"
         remote_dir = str(relative.parent) if str(relative.parent) != "." else ""
         full_remote_dir = f"{target_parent}/{remote_dir}".rstrip("/")
 
-        try:
-            content = local_file.read_text(encoding="utf-8")
-
-            # Replace attachment links with absolute Nextcloud file URLs
-            dir_urls = attachment_urls.get(full_remote_dir, {})
-            if dir_urls:
-                def _replace_link(m):
-                    label, href = m.group(1), m.group(2)
-                    if href in dir_urls:
-                        return f"[{label}]({dir_urls[href]})"
-                    return m.group(0)
-
-                content = re.sub(
-                    r"^- \[([^\]]+)\]\(([^)]+)\)$",
-                    _replace_link,
-                    content,
-                    flags=re.MULTILINE,
-                )
-
-            # Upload patched content
-            with tempfile.NamedTemporaryFile(mode="w", suffix=".md", delete=False,
-                                             encoding="utf-8") as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-            try:
-                nc.upload_file(tmp_path, remote_path)
-            finally:
-                os.unlink(tmp_path)
+        content = local_file.read_text(encoding="utf-8")
+
+        # Replace attachment links with absolute Nextcloud file URLs
+        dir_urls = attachment_urls.get(full_remote_dir, {})
+        if dir_urls:
+            def _replace_link(m):
+                label, href = m.group(1), m.group(2)
+                if href in dir_urls:
+                    return f"- [{label}]({dir_urls[href]})"
+                return m.group(0)
+
+            content = re.sub(
+                r"^- \[([^\]]+)\]\(([^)]+)\)$",
+                _replace_link,
+                content,
+                flags=re.MULTILINE,
+            )
 
-            log.info("Uploaded: %s", remote_path)
+        # Upload patched content
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".md", delete=False,
+                                         encoding="utf-8") as tmp:
+            tmp.write(content)
+            tmp_path = tmp.name
+        try:
+            nc.upload_file(tmp_path, remote_path)
+        finally:
+            os.unlink(tmp_path)
 
-            for pid, page_rec in converted.items():
-                if page_rec.get("convert_path") and Path(page_rec["convert_path"]) == local_file:
-                    page_rec["status"] = "uploaded"
-                    page_rec["upload_path"] = remote_path
-                    state.set_page(pid, page_rec)
-                    uploaded_pages.add(pid)
+    # convert_path → page IDs, so each finished file finds its pages by hash lookup
+    pids_by_path = {}
+    for pid, page_rec in converted.items():
+        if page_rec.get("convert_path"):
+            pids_by_path.setdefault(Path(page_rec["convert_path"]), []).append(pid)
 
-        except Exception as e:
-            log.error("Failed to upload %s: %s", remote_path, e)
-            for pid, page_rec in converted.items():
-                if page_rec.get("convert_path") and Path(page_rec["convert_path"]) == local_file:
+    # PUTs run on a pool; state is only updated from this thread as they complete
+    uploaded_pages = set()
+    with ThreadPoolExecutor(max_workers=nc.UPLOAD_WORKERS) as ex:
+        futures = {}
+        for local_file in md_files:
+            remote_path = f"{target_parent}/{local_file.relative_to(convert_base)}"
+            futures[ex.submit(upload_markdown, local_file, remote_path)] = (local_file, remote_path)
+
+        for fut in as_completed(futures):
+            local_file, remote_path = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                log.error("Failed to upload %s: %s", remote_path, e)
+                for pid in pids_by_path.get(local_file, ()):
+                    page_rec = converted[pid]
                     page_rec["status"] = "failed"
                     page_rec["error"] = f"Upload failed: {e}"
                     state.set_page(pid, page_rec)
+                continue
+
+            log.info("Uploaded: %s", remote_path)
 
+            for pid in pids_by_path.get(local_file, ()):
+                page_rec = converted[pid]
+                page_rec["status"] = "uploaded"
+                page_rec["upload_path"] = remote_path
+                state.set_page(pid, page_rec)
+                uploaded_pages.add(pid)
+
+    nc.close()
+    state.flush()
     summary = state.summary()
     click.echo(f"\nUpload complete: {summary}")
     sys.exit(determine_exit_code(state))
@@ -1250,23 +2096,16 @@ def migrate(space_key, pages, all_spaces, exclude_images, exclude_attachments,
         sys.exit(EXIT_AUTH)
 
     state = MigrationState().load()
+    conf_client.remember_space_keys(state.space_keys())
 
     # Resolve scope
     space_ids_keys = []
     if pages:
         page_ids = [p.strip() for p in pages.split(",")]
         fetched = conf_client.get_pages_by_ids(page_ids)
-        # Group by space
-        seen = set()
-        for pg in fetched:
-            si = str(pg.get("spaceId", ""))
-            if si not in seen:
-                seen.add(si)
-                try:
-                    sd = conf_client._get_json(f"/wiki/api/v2/spaces/{si}")
-                    space_ids_keys.append((si, sd.get("key", si)))
-                except Exception:
-                    space_ids_keys.append((si, si))
+        # Group by space, resolving every space key up front
+        keys = conf_client.get_space_keys(pg.get("spaceId", "") for pg in fetched)
+        space_ids_keys = list(keys.items())
         all_pages = fetched
     elif all_spaces:
         spaces = conf_client.get_all_spaces()
@@ -1280,12 +2119,16 @@ def migrate(space_key, pages, all_spaces, exclude_images, exclude_attachments,
         click.echo("Error: Specify --space, --pages, or --all-spaces.")
         sys.exit(EXIT_CONFIG)
 
+    # With every space in scope, two site-wide listings replace two calls per page
+    prefetched = (prefetch_page_extras(conf_client, exclude_attachments)
+                  if all_spaces and not dry_run else None)
+
     # Export each space
     for space_id, sk in space_ids_keys:
         log.info("Exporting space: %s", sk)
 
         if all_pages is None:
-            fetched_pages = conf_client.get_space_pages(space_id)
+            fetched_pages = conf_client.get_space_pages(space_id, known_etags(state, sk))
         else:
             fetched_pages = [p for p in all_pages if str(p.get("spaceId")) == str(space_id)]
 
@@ -1295,96 +2138,13 @@ def migrate(space_key, pages, all_spaces, exclude_images, exclude_attachments,
                 click.echo(f"  Page: {pg.get('title', '?')} (ID: {pg['id']})")
             continue
 
-        page_ids_set = {str(p["id"]) for p in fetched_pages}
-        parent_ids_set = {str(p.get("parentId")) for p in fetched_pages if p.get("parentId") and str(p.get("parentId")) in page_ids_set}
-        export_base = Path("export_data") / sk
-
-        for pg in fetched_pages:
-            page_id = str(pg["id"])
-            title = pg.get("title", "untitled")
-            parent_id = pg.get("parentId")
-            has_children = page_id in parent_ids_set
-
-            # Skip if already exported or beyond
-            existing = state.get_page(page_id)
-            if existing and existing.get("status") in ("exported", "converted", "uploaded"):
-                log.info("Skipping already processed page: %s", title)
-                continue
-
-            log.info("Exporting page: %s (ID: %s)", title, page_id)
+        export_space_pages(conf_client, fetched_pages, sk, state, exclude_images,
+                           exclude_attachments, skip_processed=True, prefetched=prefetched)
 
-            try:
-                body_html = ""
-                body = pg.get("body", {})
-                if isinstance(body, dict):
-                    body_html = body.get("export_view", {}).get("value", "")
-                elif isinstance(body, str):
-                    body_html = body
-
-                comments = []
-                try:
-                    comments = conf_client.get_page_comments(page_id)
-                except Exception as e:
-                    log.warning("Failed to fetch comments for %s: %s", page_id, e)
-
-                attachments = []
-                if not exclude_attachments:
-                    try:
-                        att_list = conf_client.get_page_attachments(page_id)
-                        att_dir = export_base / "attachments" / page_id
-                        for att in att_list:
-                            att_title = att.get("title", "")
-                            image_exts = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".bmp", ".webp", ".ico"}
-                            ext = Path(att_title).suffix.lower()
-                            if exclude_images and ext in image_exts:
-                                continue
-                            download_url = att.get("downloadLink", "")
-                            if not download_url:
-                                download_url = att.get("_links", {}).get("download", "")
-                            if download_url:
-                                try:
-                                    data = conf_client.download_attachment(download_url)
-                                    att_dir.mkdir(parents=True, exist_ok=True)
-                                    (att_dir / att_title).write_bytes(data)
-                                    attachments.append({"title": att_title, "size": len(data), "mediaType": att.get("mediaType", "")})
-                                except Exception as e:
-                                    log.warning("Failed to download %s: %s", att_title, e)
-                                    attachments.append({"title": att_title, "error": str(e), "mediaType": att.get("mediaType", "")})
-                    except Exception as e:
-                        log.warning("Failed to fetch attachments for %s: %s", page_id, e)
-
-                page_data = {
-                    "page_id": page_id,
-                    "title": title,
-                    "space_key": sk,
-                    "parent_id": str(parent_id) if parent_id else None,
-                    "has_children": has_children,
-                    "body": body_html,
-                    "comments": comments,
-                    "attachments": attachments,
-                }
-                pages_dir = export_base / "pages"
-                pages_dir.mkdir(parents=True, exist_ok=True)
-                export_path = pages_dir / f"{page_id}.json"
-                export_path.write_text(json.dumps(page_data, indent=2, ensure_ascii=False), encoding="utf-8")
-
-                record = MigrationState.new_page_record(page_id, title, sk, parent_id, has_children)
-                record["status"] = "exported"
-                record["export_path"] = str(export_path)
-                record["attachments"] = attachments
-                record["comments"] = [{"id": c.get("id")} for c in comments]
-                state.set_page(page_id, record)
-                log.info("Exported: %s", title)
-
-            except Exception as e:
-                log.error("Failed to export page %s: %s", page_id, e)
-                record = MigrationState.new_page_record(page_id, title, sk, parent_id, has_children)
-                record["status"] = "failed"
-                record["error"] = str(e)
-                state.set_page(page_id, record)
+    state.flush()
 
     # Check if export produced anything
-    exported_count = len(state.get_pages_by_status("exported"))
+    exported_count = state.summary().get("exported", 0)
     if exported_count == 0 and not dry_run:
         summary = state.summary()
         if summary.get("failed", 0) == sum(summary.values()):
@@ -1395,57 +2155,14 @@ def migrate(space_key, pages, all_spaces, exclude_images, exclude_attachments,
         click.echo("\n[DRY RUN] Pipeline preview complete.")
         sys.exit(EXIT_SUCCESS)
 
-    # --- Convert phase ---
-    click.echo("\n" + "=" * 60)
-    click.echo("Phase 2: Convert")
-    click.echo("=" * 60)
-
-    converter = Converter(exclude_images=exclude_images, exclude_attachments=exclude_attachments)
-    exported = state.get_pages_by_status("exported")
-    tree = converter.build_output_tree(state)
-
-    for pid, page_rec in exported.items():
-        title = page_rec.get("title", "?")
-        log.info("Converting: %s", title)
+    # Confluence is done with; don't hold its idle connections through convert/upload
+    conf_client.close()
 
-        try:
-            export_path = page_rec.get("export_path")
-            if not export_path or not Path(export_path).exists():
-                raise FileNotFoundError(f"Export file not found: {export_path}")
-
-            page_data = json.loads(Path(export_path).read_text(encoding="utf-8"))
-            path_info = tree.get(pid)
-            if not path_info:
-                log.warning("No output path for page %s, skipping", pid)
-                continue
-
-            sk = page_rec.get("space_key", "default")
-            convert_base = Path("convert_data") / sk
-            output_path = convert_base / path_info["path"]
-            output_dir = convert_base / path_info["dir"] if path_info["dir"] else convert_base
-
-            md = converter.convert_page(page_data)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            output_path.write_text(md, encoding="utf-8")
-
-            att_src = Path("export_data") / sk / "attachments" / pid
-            if att_src.exists():
-                converter.copy_attachments(page_data, att_src, output_dir)
-
-            page_rec["status"] = "converted"
-            page_rec["convert_path"] = str(output_path)
-            state.set_page(pid, page_rec)
-            log.info("Converted: %s → %s", title, path_info["path"])
-
-        except Exception as e:
-            log.error("Failed to convert page %s: %s", pid, e)
-            page_rec["status"] = "failed"
-            page_rec["error"] = str(e)
-            state.set_page(pid, page_rec)
-
-    # --- Upload phase ---
+    # --- Convert + upload phases, overlapped ---
+    # The output tree needs every exported page, so conversion starts once export
+    # is done; from there each page is uploaded as soon as it has converted.
     click.echo("\n" + "=" * 60)
-    click.echo("Phase 3: Upload")
+    click.echo("Phase 2/3: Convert and upload")
     click.echo("=" * 60)
 
     require_env("NEXTCLOUD_URL", "NEXTCLOUD_USERNAME", "NEXTCLOUD_PASSWORD", "NEXTCLOUD_COLLECTIVE")
@@ -1466,48 +2183,91 @@ def migrate(space_key, pages, all_spaces, exclude_images, exclude_attachments,
 
     nc.mkdir_p(target_parent)
 
-    converted = state.get_pages_by_status("converted")
-    for pid, page_rec in converted.items():
-        sk = page_rec.get("space_key", "default")
-        convert_base = Path("convert_data") / sk
-        convert_path = page_rec.get("convert_path")
-
-        if not convert_path or not Path(convert_path).exists():
-            log.warning("Convert path not found for %s, skipping upload", pid)
-            continue
-
-        convert_file = Path(convert_path)
-        relative = convert_file.relative_to(convert_base)
-        remote_path = f"{target_parent}/{relative}"
-
-        parent_dirs = str(relative.parent)
-        if parent_dirs and parent_dirs != ".":
-            nc.mkdir_p(f"{target_parent}/{parent_dirs}")
+    converter = Converter(exclude_images=exclude_images, exclude_attachments=exclude_attachments)
+    exported = state.get_pages_by_status("exported")
+    converted = state.get_pages_by_status("converted")  # left over from earlier runs
+    tree = converter.build_output_tree(state)
 
+    # Create the tree's directories up front so parallel PUTs never race on MKCOL;
+    # start_upload() only hits the cache for these
+    for remote_dir in sorted({info["dir"] for pid, info in tree.items() if pid in exported}):
+        if remote_dir:
+            nc.mkdir_p(f"{target_parent}/{remote_dir}")
+
+    # Pages upload in parallel and each page PUTs its markdown and attachments
+    # together; split the pool so the two levels stay within the session's connections
+    per_page_workers = max(1, nc.POOL_SIZE // nc.UPLOAD_WORKERS)
+
+    def upload_page(page_rec, convert_file, convert_base, remote_path):
+        to_upload = [(convert_file, remote_path)]
+        for att in page_rec.get("attachments", []):
+            if att.get("title"):
+                f = convert_file.parent / att["title"]
+                to_upload.append((f, f"{target_parent}/{f.relative_to(convert_base)}"))
+
+        errors = nc.upload_many(to_upload, max_workers=per_page_workers)
+        if remote_path in errors:
+            raise errors.pop(remote_path)
+        for f_remote, exc in errors.items():
+            # Attachments skipped at export or convert time have no local file
+            if not isinstance(exc, FileNotFoundError):
+                raise exc
+        log.debug("Uploaded %d attachment(s) for %s", len(to_upload) - 1 - len(errors), remote_path)
+
+    def record_upload(fut):
+        pid, page_rec, remote_path = upload_futures.pop(fut)
         try:
-            nc.upload_file(str(convert_file), remote_path)
-
-            # Also upload attachments in the same directory
-            output_dir = convert_file.parent
-            for f in output_dir.iterdir():
-                if f.is_file() and f != convert_file and f.suffix != ".md":
-                    f_relative = f.relative_to(convert_base)
-                    f_remote = f"{target_parent}/{f_relative}"
-                    nc.upload_file(str(f), f_remote)
-                    log.debug("Uploaded attachment: %s", f_remote)
-
-            page_rec["status"] = "uploaded"
-            page_rec["upload_path"] = remote_path
-            state.set_page(pid, page_rec)
-            log.info("Uploaded: %s → %s", page_rec["title"], remote_path)
-
+            fut.result()
+        except FileNotFoundError:
+            # State is trusted to point at a file; only a failed open reveals otherwise
+            log.warning("Convert path not found for %s, skipping upload", pid)
+            return
         except Exception as e:
             log.error("Failed to upload %s: %s", pid, e)
             page_rec["status"] = "failed"
             page_rec["error"] = f"Upload failed: {e}"
             state.set_page(pid, page_rec)
+            return
+        page_rec["status"] = "uploaded"
+        page_rec["upload_path"] = remote_path
+        state.set_page(pid, page_rec)
+        log.info("Uploaded: %s → %s", page_rec["title"], remote_path)
+
+    def start_upload(pid, page_rec):
+        convert_base = Path("convert_data") / page_rec.get("space_key", "default")
+        convert_path = page_rec.get("convert_path")
+        if not convert_path:
+            log.warning("Convert path not found for %s, skipping upload", pid)
+            return
+        convert_file = Path(convert_path)
+        relative = convert_file.relative_to(convert_base)
+        remote_path = f"{target_parent}/{relative}"
+        if str(relative.parent) != ".":
+            nc.mkdir_p(f"{target_parent}/{relative.parent}")
+        fut = upload_pool.submit(upload_page, page_rec, convert_file, convert_base, remote_path)
+        upload_futures[fut] = (pid, page_rec, remote_path)
+        # Record uploads that already finished, so state keeps up during conversion
+        for done in [f for f in upload_futures if f.done()]:
+            record_upload(done)
+
+    # Upload threads are running while pages convert. A fork()ed worker could inherit
+    # a lock one of them holds (session pool, logging), so conversion workers start
+    # from a fresh interpreter and set up their own logging
+    convert_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=setup_logging, initargs=(debug, log_file))
+    upload_futures = {}
+    with convert_pool, ThreadPoolExecutor(max_workers=nc.UPLOAD_WORKERS) as upload_pool:
+        for pid, page_rec in converted.items():
+            start_upload(pid, page_rec)
+        convert_pages(state, exported, tree, exclude_images, exclude_attachments,
+                      on_converted=start_upload, executor=convert_pool)
+        for fut in as_completed(list(upload_futures)):
+            record_upload(fut)
+
+    nc.close()
 
     # Final summary
+    state.flush()
     summary = state.summary()
     click.echo("\n" + "=" * 60)
     click.echo("Migration complete")
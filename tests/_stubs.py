@@ -0,0 +1,39 @@
+"""Lightweight stand-ins for HTTP objects used across the tests."""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+
+
+@dataclass(slots=True)
+class FakeResponse:
+    """Just enough of requests.Response for the clients; far cheaper to build than MagicMock.
+
+    ``chunks`` feeds iter_content(); a response without a JSON payload raises from
+    json() like an empty body would.
+    """
+
+    status_code: int = 200
+    _json: Any = None
+    headers: dict = field(default_factory=dict)
+    content: bytes = b""
+    chunks: Any = ()
+    closed: bool = False
+    chunk_size: Any = None  # as last passed to iter_content()
+
+    def json(self):
+        if self._json is None:
+            raise ValueError("response has no JSON body")
+        return self._json
+
+    def iter_content(self, chunk_size=1):
+        self.chunk_size = chunk_size
+        return iter(self.chunks)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+    def close(self):
+        self.closed = True
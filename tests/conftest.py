@@ -1,6 +1,8 @@
 """Shared fixtures for migration tests."""
 
+import copy
 import json
+import re
 from pathlib import Path
 from unittest.mock import MagicMock
 
@@ -9,27 +11,46 @@ import pytest
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
 
 
-@pytest.fixture
+# Fixture files are read once per session; mutable payloads are handed out as copies.
+
+
+@pytest.fixture(scope="session")
 def sample_page_html():
     return (FIXTURES_DIR / "sample_page.html").read_text(encoding="utf-8")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_tables_html():
     return (FIXTURES_DIR / "sample_page_tables.html").read_text(encoding="utf-8")
 
 
-@pytest.fixture
-def sample_comments():
+@pytest.fixture(scope="session")
+def _sample_comments():
     return json.loads((FIXTURES_DIR / "sample_comments.json").read_text(encoding="utf-8"))
 
 
 @pytest.fixture
-def tmp_state(tmp_path):
-    """Return a MigrationState using a temp directory."""
+def sample_comments(_sample_comments):
+    return copy.deepcopy(_sample_comments)
+
+
+@pytest.fixture(scope="module")
+def _state_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("state")
+
+
+@pytest.fixture
+def tmp_state(_state_dir, request):
+    """Return a MigrationState with a fresh file in a temp directory shared by the module.
+
+    The file is named after the test's full node ID, unique across classes and
+    parametrizations. Autosave is off: tests that check the file on disk call
+    flush() first.
+    """
     from migrate import MigrationState
 
-    state = MigrationState(path=tmp_path / ".migration-state.json")
+    name = re.sub(r"[^\w.-]+", "_", request.node.nodeid)
+    state = MigrationState(path=_state_dir / f"{name}.json", autosave=False)
     return state
 
 
@@ -51,7 +72,7 @@ def sample_page_data(sample_page_html, sample_comments):
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_confluence_response():
     """Factory for mock Confluence API responses."""
 
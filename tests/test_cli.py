@@ -1,53 +1,46 @@
 """Tests for CLI commands."""
 
-import os
+import json
+from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 import pytest
 from click.testing import CliRunner
 
-from migrate import cli
+from migrate import (
+    Converter, MigrationState, PageRecord, cli, convert_pages, export_space_pages, iter_files,
+    known_etags, load_page_export, parent_ids, prefetch_page_extras,
+)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def runner():
     return CliRunner()
 
 
-class TestHelp:
-    def test_main_help(self, runner):
-        result = runner.invoke(cli, ["--help"])
-        assert result.exit_code == 0
-        assert "export" in result.output
-        assert "convert" in result.output
-        assert "upload" in result.output
-        assert "migrate" in result.output
-        assert "status" in result.output
-
-    def test_export_help(self, runner):
-        result = runner.invoke(cli, ["export", "--help"])
-        assert result.exit_code == 0
-        assert "--space" in result.output
-        assert "--pages" in result.output
-        assert "--dry-run" in result.output
-        assert "--debug" in result.output
+@pytest.fixture(scope="session")
+def help_results():
+    """--help output is deterministic, so each command's is rendered once."""
+    r = CliRunner()
+    return {
+        cmd: r.invoke(cli, ([cmd] if cmd else []) + ["--help"])
+        for cmd in (None, "export", "convert", "upload", "migrate")
+    }
 
-    def test_convert_help(self, runner):
-        result = runner.invoke(cli, ["convert", "--help"])
-        assert result.exit_code == 0
-        assert "--exclude-images" in result.output
-        assert "--exclude-attachments" in result.output
 
-    def test_upload_help(self, runner):
-        result = runner.invoke(cli, ["upload", "--help"])
-        assert result.exit_code == 0
-        assert "--target-parent" in result.output
-
-    def test_migrate_help(self, runner):
-        result = runner.invoke(cli, ["migrate", "--help"])
+class TestHelp:
+    @pytest.mark.parametrize("subcmd,expected", [
+        (None, ["export", "convert", "upload", "migrate", "status"]),
+        ("export", ["--space", "--pages", "--dry-run", "--debug"]),
+        ("convert", ["--exclude-images", "--exclude-attachments"]),
+        ("upload", ["--target-parent"]),
+        ("migrate", ["--space", "--target-parent"]),
+    ])
+    def test_help(self, help_results, subcmd, expected):
+        result = help_results[subcmd]
         assert result.exit_code == 0
-        assert "--space" in result.output
-        assert "--target-parent" in result.output
+        for text in expected:
+            assert text in result.output
 
     def test_version(self, runner):
         result = runner.invoke(cli, ["--version"])
@@ -55,43 +48,50 @@ class TestHelp:
         assert "0.1.0" in result.output
 
 
+CONFIG_VARS = (
+    "CONFLUENCE_BASE_URL", "CONFLUENCE_USERNAME", "CONFLUENCE_API_TOKEN",
+    "NEXTCLOUD_URL", "NEXTCLOUD_USERNAME", "NEXTCLOUD_PASSWORD", "NEXTCLOUD_COLLECTIVE",
+)
+
+
+@pytest.fixture
+def clean_env(monkeypatch):
+    """Unset every Confluence/Nextcloud variable; tests setenv() what they need."""
+    for key in CONFIG_VARS:
+        monkeypatch.delenv(key, raising=False)
+    return monkeypatch
+
+
 class TestMissingConfig:
-    def test_export_missing_env(self, runner):
-        env = {
-            "CONFLUENCE_BASE_URL": "",
-            "CONFLUENCE_USERNAME": "",
-            "CONFLUENCE_API_TOKEN": "",
-        }
-        with patch.dict(os.environ, env, clear=False):
-            result = runner.invoke(cli, ["export", "--space", "TEST"])
-            assert result.exit_code != 0
-            assert "Missing required" in result.output or "Error" in result.output
-
-    def test_upload_missing_env(self, runner):
-        env = {
-            "NEXTCLOUD_URL": "",
-            "NEXTCLOUD_USERNAME": "",
-            "NEXTCLOUD_PASSWORD": "",
-            "NEXTCLOUD_COLLECTIVE": "",
-        }
-        with patch.dict(os.environ, env, clear=False):
-            result = runner.invoke(cli, ["upload"])
-            assert result.exit_code != 0
+    def test_export_missing_env(self, runner, clean_env):
+        result = runner.invoke(cli, ["export", "--space", "TEST"])
+        assert result.exit_code != 0
+        assert "Missing required" in result.output or "Error" in result.output
+
+    def test_upload_missing_env(self, runner, clean_env):
+        result = runner.invoke(cli, ["upload"])
+        assert result.exit_code != 0
+
+    def test_export_invalid_rpm(self, runner, clean_env):
+        for key in ("CONFLUENCE_BASE_URL", "CONFLUENCE_USERNAME", "CONFLUENCE_API_TOKEN"):
+            clean_env.setenv(key, "x")
+        clean_env.setenv("CONFLUENCE_RPM", "60.5")
+        result = runner.invoke(cli, ["export", "--space", "TEST"])
+        assert result.exit_code != 0
+        assert "CONFLUENCE_RPM must be a whole number" in result.output
+        assert not isinstance(result.exception, ValueError)
 
 
 class TestScopeValidation:
-    def test_export_no_scope_fails(self, runner):
-        env = {
-            "CONFLUENCE_BASE_URL": "https://test.atlassian.net",
-            "CONFLUENCE_USERNAME": "user",
-            "CONFLUENCE_API_TOKEN": "token",
-        }
-        with patch.dict(os.environ, env, clear=False):
-            # Mock auth verification
-            with patch("migrate.ConfluenceClient.verify_auth"):
-                result = runner.invoke(cli, ["export"])
-                assert result.exit_code != 0
-                assert "Specify --space" in result.output
+    def test_export_no_scope_fails(self, runner, clean_env):
+        clean_env.setenv("CONFLUENCE_BASE_URL", "https://test.atlassian.net")
+        clean_env.setenv("CONFLUENCE_USERNAME", "user")
+        clean_env.setenv("CONFLUENCE_API_TOKEN", "token")
+        # Mock auth verification
+        with patch("migrate.ConfluenceClient.verify_auth"):
+            result = runner.invoke(cli, ["export"])
+            assert result.exit_code != 0
+            assert "Specify --space" in result.output
 
 
 class TestDryRun:
@@ -106,3 +106,400 @@ class TestDryRun:
         with patch("migrate.STATE_FILE", str(tmp_path / ".migration-state.json")):
             result = runner.invoke(cli, ["status"])
             assert "No migration state" in result.output
+
+
+class TestParentIds:
+    def test_only_parents_within_the_batch(self):
+        pages = [
+            {"id": "1"},
+            {"id": 2, "parentId": "1"},
+            {"id": "3", "parentId": 2},
+            {"id": "4", "parentId": "99"},  # parent outside this space
+        ]
+        assert parent_ids(pages) == {"1", "2"}
+
+
+class TestExportSpacePages:
+    @pytest.fixture
+    def confluence(self):
+        client = MagicMock()
+        client.get_page_comments.return_value = []
+        client.get_page_attachments.return_value = []
+        return client
+
+    @pytest.fixture
+    def space_pages(self):
+        return [
+            {"id": "1", "title": "Root", "body": {"export_view": {"value": "<p>root</p>"}}},
+            {"id": "2", "title": "Child", "parentId": "1", "body": {"export_view": {"value": "<p>c</p>"}}},
+        ]
+
+    def test_exports_pages_and_flags_parents(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        assert state.get_page("1")["status"] == "exported"
+        assert state.get_page("1")["has_children"] is True
+        assert state.get_page("2")["has_children"] is False
+        assert (tmp_path / "export_data" / "SP" / "pages" / "2.json").exists()
+
+    def test_state_flushed_at_end_of_space(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        on_disk = MigrationState(path=state.path, autosave=False).load()
+        assert on_disk.summary() == {"exported": 2}
+
+    def test_identical_reexport_keeps_record_and_file(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state)
+        rec = state.get_page("1")
+        rec.update(status="converted", convert_path="convert_data/SP/Readme.md")
+        state.set_page("1", rec)
+        export_file = tmp_path / "export_data" / "SP" / "pages" / "1.json"
+        mtime = export_file.stat().st_mtime_ns
+
+        space_pages[1]["body"] = {"export_view": {"value": "<p>changed</p>"}}
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        kept = state.get_page("1")
+        assert isinstance(kept, PageRecord)
+        assert (kept.status, kept.error) == ("converted", None)
+        assert kept.convert_path == "convert_data/SP/Readme.md"
+        assert export_file.stat().st_mtime_ns == mtime
+        assert state.get_page("2")["status"] == "exported"
+        assert "changed" in (export_file.parent / "2.json").read_text(encoding="utf-8")
+
+    def test_page_json_is_utf8(self, confluence, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        pages = [{"id": "1", "title": "Überblick", "body": {"export_view": {"value": "<p>naïve — ok</p>"}}}]
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, pages, "SP", state)
+
+        raw = (tmp_path / "export_data" / "SP" / "pages" / "1.json").read_bytes()
+        assert "Überblick".encode("utf-8") in raw  # not \u-escaped
+        assert json.loads(raw)["body"] == "<p>naïve — ok</p>"
+
+    def test_comments_fetched_alongside_attachments(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        confluence.get_page_comments.return_value = [{"id": "c1"}]
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        assert state.get_page("1")["comments"] == [{"id": "c1"}]
+        assert confluence.get_page_attachments.call_count == 2
+
+    def test_comment_failure_does_not_fail_page(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        confluence.get_page_comments.side_effect = RuntimeError("boom")
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        assert state.get_page("1")["status"] == "exported"
+        assert state.get_page("1")["comments"] == []
+
+    def test_attachments_downloaded_in_order(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        confluence.get_page_attachments.return_value = [
+            {"title": f"f{i}.pdf", "downloadLink": f"/download/f{i}.pdf"} for i in range(5)
+        ]
+
+        def download(url, dest):
+            if url.endswith("f2.pdf"):
+                raise RuntimeError("gone")
+            return 10
+
+        confluence.download_attachment.side_effect = download
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages[:1], "SP", state)
+
+        atts = state.get_page("1")["attachments"]
+        assert [a["title"] for a in atts] == [f"f{i}.pdf" for i in range(5)]
+        assert atts[2]["error"] == "gone"
+        assert atts[0]["size"] == 10
+
+    def test_prefetched_listings_skip_per_page_calls(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        confluence.download_attachment.return_value = 3
+        prefetched = (
+            {"1": [{"id": "c1"}]},
+            {"2": [{"title": "x.pdf", "downloadLink": "/download/x.pdf"}]},
+        )
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state, prefetched=prefetched)
+
+        confluence.get_page_comments.assert_not_called()
+        confluence.get_page_attachments.assert_not_called()
+        assert state.get_page("1")["comments"] == [{"id": "c1"}]
+        assert state.get_page("2")["comments"] == []
+        assert state.get_page("2")["attachments"][0]["title"] == "x.pdf"
+
+    def test_prefetch_failure_falls_back(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        confluence.get_all_footer_comments.side_effect = RuntimeError("403")
+        confluence.get_all_attachments.return_value = {}
+        prefetched = prefetch_page_extras(confluence)
+        assert prefetched == (None, {})
+
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state, prefetched=prefetched)
+        assert confluence.get_page_comments.call_count == 2
+        confluence.get_page_attachments.assert_not_called()
+
+    def test_skip_processed(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        done = MigrationState.new_page_record("1", "Root", "SP")
+        done["status"] = "uploaded"
+        state.set_page("1", done)
+
+        export_space_pages(confluence, space_pages, "SP", state, skip_processed=True)
+
+        assert state.get_page("1")["status"] == "uploaded"
+        assert state.get_page("2")["status"] == "exported"
+        confluence.get_page_comments.assert_called_once_with("2")
+
+    def test_unchanged_pages_keep_their_record(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_file = tmp_path / "1.json"
+        export_file.write_text("{}")
+        done = MigrationState.new_page_record("1", "Root", "SP", has_children=True)
+        done.update(status="converted", convert_path="convert_data/SP/Readme.md", etag='"v1"',
+                    export_path=str(export_file))
+        state.set_page("1", done)
+
+        space_pages[0] = {"id": "1", "title": "Root", "not_modified": True}
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        assert state.get_page("1")["status"] == "converted"
+        assert state.get_page("1")["convert_path"] == "convert_data/SP/Readme.md"
+        assert state.get_page("2")["status"] == "exported"
+        confluence.get_page_comments.assert_called_once_with("2")
+        confluence.get_pages_by_ids.assert_not_called()
+
+    def test_unchanged_page_without_record_refetched(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        full = space_pages[0]
+        space_pages[0] = {"id": "1", "title": "Root", "not_modified": True}
+        confluence.get_pages_by_ids.return_value = [full]
+
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        confluence.get_pages_by_ids.assert_called_once_with(["1"])
+        export = json.loads(Path(state.get_page("1")["export_path"]).read_text(encoding="utf-8"))
+        assert export["body"] == "<p>root</p>"
+
+    def test_unchanged_but_moved_page_reexported(self, confluence, space_pages, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_space_pages(confluence, space_pages, "SP", state)
+        # Page 2 moves to the top level without a body edit: its ETag still matches
+        moved = {**space_pages[1], "parentId": None}
+        space_pages[1] = {"id": "2", "title": "Child", "not_modified": True}
+        confluence.get_pages_by_ids.return_value = [moved]
+
+        export_space_pages(confluence, space_pages, "SP", state)
+
+        confluence.get_pages_by_ids.assert_called_once_with(["2"])
+        assert state.get_page("2")["parent_id"] is None
+        assert state.get_page("1")["has_children"] is False
+
+    def test_known_etags_requires_export_file(self, tmp_path):
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        export_file = tmp_path / "1.json"
+        export_file.write_text("{}")
+        for pid, path in (("1", export_file), ("2", tmp_path / "missing.json")):
+            rec = MigrationState.new_page_record(pid, "Page", "SP")
+            rec.update(status="exported", export_path=str(path), etag=f'"{pid}"')
+            state.set_page(pid, rec)
+        failed = MigrationState.new_page_record("3", "Broken", "SP")
+        failed.update(status="failed", export_path=str(export_file), etag='"3"')
+        state.set_page("3", failed)
+
+        assert known_etags(state, "SP") == {"1": '"1"'}
+        assert known_etags(state, "OTHER") == {}
+
+
+class TestUploadCommand:
+    def test_uploads_pages_in_parallel_and_records_failures(self, runner, tmp_path, clean_env):
+        clean_env.chdir(tmp_path)
+        base = tmp_path / "convert_data" / "SP"
+        base.mkdir(parents=True)
+        state_file = tmp_path / ".migration-state.json"
+        state = MigrationState(path=state_file, autosave=False)
+        for pid, name in (("1", "Readme.md"), ("2", "Child.md"), ("3", "Other.md")):
+            (base / name).write_text(f"# {name}", encoding="utf-8")
+            rec = MigrationState.new_page_record(pid, name, "SP")
+            rec.update(status="converted", convert_path=str(Path("convert_data/SP") / name))
+            state.set_page(pid, rec)
+        state.flush()
+
+        nc = MagicMock()
+        nc.UPLOAD_WORKERS = 4
+        nc.upload_many.return_value = {}
+
+        def upload_file(local, remote):
+            if remote.endswith("Child.md"):
+                raise RuntimeError("HTTP 507")
+
+        nc.upload_file.side_effect = upload_file
+        for key, value in (("NEXTCLOUD_URL", "https://nc.example.com"), ("NEXTCLOUD_USERNAME", "u"),
+                           ("NEXTCLOUD_PASSWORD", "p"), ("NEXTCLOUD_COLLECTIVE", "C")):
+            clean_env.setenv(key, value)
+        with patch("migrate.STATE_FILE", str(state_file)), \
+                patch("migrate.NextcloudClient", return_value=nc):
+            result = runner.invoke(cli, ["upload"])
+
+        assert result.exit_code == 1, result.output
+        final = MigrationState(path=state_file, autosave=False).load()
+        assert final.get_page("1")["status"] == "uploaded"
+        assert final.get_page("3")["upload_path"] == "MigratedPages/Other.md"
+        assert final.get_page("2")["status"] == "failed"
+        assert "HTTP 507" in final.get_page("2")["error"]
+
+    def test_attachment_links_point_at_file_ids(self, runner, tmp_path, clean_env):
+        clean_env.chdir(tmp_path)
+        base = tmp_path / "convert_data" / "SP"
+        base.mkdir(parents=True)
+        (base / "spec.pdf").write_bytes(b"pdf")
+        (base / "notes.txt").write_bytes(b"txt")
+        (base / "Readme.md").write_text(
+            "# Home\n\n## Attachments\n\n- [spec.pdf](spec.pdf)\n- [notes.txt](notes.txt)\n",
+            encoding="utf-8",
+        )
+        state_file = tmp_path / ".migration-state.json"
+        state = MigrationState(path=state_file, autosave=False)
+        rec = MigrationState.new_page_record("1", "Home", "SP")
+        rec.update(status="converted", convert_path=str(Path("convert_data/SP/Readme.md")))
+        state.set_page("1", rec)
+        state.flush()
+
+        nc = MagicMock()
+        nc.UPLOAD_WORKERS = 4
+        nc.upload_many.return_value = {}
+        nc.get_file_id.side_effect = lambda remote: "77" if remote.endswith("spec.pdf") else None
+        nc.file_url.side_effect = lambda file_id, remote_dir: f"https://nc/f/{file_id}"
+        uploaded = {}
+        nc.upload_file.side_effect = lambda local, remote: uploaded.update(
+            {remote: Path(local).read_text(encoding="utf-8")})
+        for key in ("NEXTCLOUD_URL", "NEXTCLOUD_USERNAME", "NEXTCLOUD_PASSWORD", "NEXTCLOUD_COLLECTIVE"):
+            clean_env.setenv(key, "x")
+        with patch("migrate.STATE_FILE", str(state_file)), \
+                patch("migrate.NextcloudClient", return_value=nc):
+            result = runner.invoke(cli, ["upload"])
+
+        assert result.exit_code == 0, result.output
+        assert nc.get_file_id.call_count == 2
+        md = uploaded["MigratedPages/Readme.md"]
+        assert "- [spec.pdf](https://nc/f/77)" in md
+        assert "- [notes.txt](notes.txt)" in md  # no file ID, link left as is
+
+
+class TestLoadPageExport:
+    def test_reads_export(self, tmp_path):
+        path = tmp_path / "1.json"
+        path.write_bytes('{"title": "Überblick"}'.encode("utf-8"))
+        assert load_page_export(str(path)) == {"title": "Überblick"}
+
+    @pytest.mark.parametrize("name", [None, "missing.json"])
+    def test_missing_export_raises(self, tmp_path, name):
+        with pytest.raises(FileNotFoundError, match="Export file not found"):
+            load_page_export(name and str(tmp_path / name))
+
+
+class TestConvertPages:
+    def _exported_state(self, tmp_path, count):
+        pages_dir = tmp_path / "export_data" / "SP" / "pages"
+        pages_dir.mkdir(parents=True)
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
+        for i in range(count):
+            pid = str(i)
+            export_path = pages_dir / f"{pid}.json"
+            export_path.write_text(json.dumps({
+                "page_id": pid, "title": f"Page {i}", "body": f"<p>Body {i}</p>",
+                "comments": [], "attachments": [],
+            }), encoding="utf-8")
+            rec = MigrationState.new_page_record(pid, f"Page {i}", "SP", parent_id="0" if i else None)
+            rec.update(status="exported", export_path=str(export_path.relative_to(tmp_path)))
+            state.set_page(pid, rec)
+        return state
+
+    @pytest.mark.parametrize("min_parallel", [100, 1])  # in-process, then process pool
+    def test_converts_and_records(self, tmp_path, monkeypatch, min_parallel):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr("migrate.CONVERT_MIN_PARALLEL", min_parallel)
+        state = self._exported_state(tmp_path, 3)
+        (tmp_path / "export_data" / "SP" / "pages" / "2.json").unlink()
+        exported = state.get_pages_by_status("exported")
+        tree = Converter().build_output_tree(state)
+
+        convert_pages(state, exported, tree)
+
+        assert state.get_page("0")["convert_path"] == str(Path("convert_data/SP/Readme.md"))
+        assert "Body 1" in (tmp_path / "convert_data" / "SP" / "Page 1.md").read_text(encoding="utf-8")
+        assert state.get_page("2")["status"] == "failed"
+        assert "Export file not found" in state.get_page("2")["error"]
+
+    def test_on_converted_called_for_successes(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        state = self._exported_state(tmp_path, 3)
+        (tmp_path / "export_data" / "SP" / "pages" / "1.json").unlink()
+        seen = []
+
+        convert_pages(state, state.get_pages_by_status("exported"),
+                      Converter().build_output_tree(state),
+                      on_converted=lambda pid, rec: seen.append((pid, rec["status"])))
+
+        assert sorted(seen) == [("0", "converted"), ("2", "converted")]
+
+
+class TestIterFiles:
+    def test_walks_files_only_in_sorted_order(self, tmp_path):
+        (tmp_path / "b").mkdir()
+        (tmp_path / "a" / "empty").mkdir(parents=True)
+        for rel in ("z.md", "Readme.md", "b/y.png", "b/x.md", "a/c.md"):
+            (tmp_path / rel).write_text("x")
+
+        rels = [p.relative_to(tmp_path).as_posix() for p in iter_files(tmp_path)]
+        assert rels == ["Readme.md", "z.md", "a/c.md", "b/x.md", "b/y.png"]
+
+
+class TestMigrateCommand:
+    def test_uploads_pages_as_they_convert(self, runner, tmp_path, clean_env):
+        clean_env.chdir(tmp_path)
+        for key in CONFIG_VARS:
+            clean_env.setenv(key, "x")
+        confluence = MagicMock()
+        confluence.get_space_by_key.return_value = {"id": "10", "key": "SP"}
+        confluence.get_space_pages.return_value = [
+            {"id": "1", "title": "Root", "spaceId": "10", "body": {"export_view": {"value": "<p>root</p>"}}},
+            {"id": "2", "title": "Child", "parentId": "1", "spaceId": "10",
+             "body": {"export_view": {"value": "<p>c</p>"}}},
+        ]
+        confluence.get_page_comments.return_value = []
+        confluence.get_page_attachments.return_value = []
+        nc = MagicMock()
+        nc.POOL_SIZE, nc.UPLOAD_WORKERS = 16, 4
+        nc.upload_many.return_value = {}
+        state_file = tmp_path / ".migration-state.json"
+
+        with patch("migrate.STATE_FILE", str(state_file)), \
+                patch("migrate.ConfluenceClient", return_value=confluence), \
+                patch("migrate.NextcloudClient", return_value=nc), \
+                patch("migrate.convert_pages", wraps=convert_pages) as mock_convert:
+            result = runner.invoke(cli, ["migrate", "--space", "SP"])
+
+        assert result.exit_code == 0, result.output
+        kwargs = mock_convert.call_args[1]
+        assert kwargs["on_converted"] is not None  # uploads start from inside conversion
+        # Upload threads are live by then, so workers must not be fork()ed from this process
+        assert kwargs["executor"]._mp_context.get_start_method() == "spawn"
+        remotes = {c[0][0][0][1] for c in nc.upload_many.call_args_list}
+        assert remotes == {"MigratedPages/Readme.md", "MigratedPages/Child.md"}
+        final = MigrationState(path=state_file, autosave=False).load()
+        assert final.summary() == {"uploaded": 2}
@@ -1,13 +1,22 @@
 """Tests for ConfluenceClient."""
 
+import os
 import time
-from unittest.mock import MagicMock, patch, PropertyMock
+from unittest.mock import Mock, patch
 
 import click
 import pytest
 import requests
 
-from migrate import ConfluenceClient
+from migrate import ConfluenceClient, _AdaptiveConcurrency, _RateLimiter
+
+from ._stubs import FakeResponse
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Retry and rate-limit waits return immediately; tests that check them patch sleep themselves."""
+    monkeypatch.setattr(time, "sleep", lambda *_: None)
 
 
 @pytest.fixture
@@ -15,142 +24,309 @@ def client():
     return ConfluenceClient("https://test.atlassian.net", "user@test.com", "test-token")
 
 
+@pytest.fixture
+def session_request(client, monkeypatch):
+    """Stand-in for client.session.request; tests set return_value or side_effect."""
+    m = Mock()
+    monkeypatch.setattr(client.session, "request", m)
+    return m
+
+
 class TestConfluenceAuth:
-    def test_verify_auth_success(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.json.return_value = {
-            "type": "known",
-            "displayName": "Test User",
-        }
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp):
-            result = client.verify_auth()
-            assert result["displayName"] == "Test User"
-
-    def test_verify_auth_anonymous_raises(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.json.return_value = {"type": "anonymous"}
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp):
-            with pytest.raises(click.ClickException, match="anonymous"):
-                client.verify_auth()
+    def test_verify_auth_success(self, client, session_request):
+        mock_resp = FakeResponse(200, {"type": "known", "displayName": "Test User"})
 
+        session_request.return_value = mock_resp
+        result = client.verify_auth()
+        assert result["displayName"] == "Test User"
 
-class TestPagination:
-    def test_paginate_single_page(self, client, mock_confluence_response):
-        responses = [mock_confluence_response([{"id": "1"}, {"id": "2"}])]
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.json.side_effect = responses
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp):
-            results = list(client._paginate("/wiki/api/v2/test"))
-            assert len(results) == 2
-
-    def test_paginate_multiple_pages(self, client):
-        page1_resp = MagicMock()
-        page1_resp.status_code = 200
-        page1_resp.json.return_value = {
-            "results": [{"id": "1"}],
-            "_links": {"next": "/wiki/api/v2/test?cursor=abc"},
-        }
-        page1_resp.raise_for_status = MagicMock()
-
-        page2_resp = MagicMock()
-        page2_resp.status_code = 200
-        page2_resp.json.return_value = {
-            "results": [{"id": "2"}],
-            "_links": {},
-        }
-        page2_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", side_effect=[page1_resp, page2_resp]):
-            results = list(client._paginate("/wiki/api/v2/test"))
-            assert len(results) == 2
-            assert results[0]["id"] == "1"
-            assert results[1]["id"] == "2"
+    def test_verify_auth_anonymous_raises(self, client, session_request):
+        mock_resp = FakeResponse(200, {"type": "anonymous"})
 
+        session_request.return_value = mock_resp
+        with pytest.raises(click.ClickException, match="anonymous"):
+            client.verify_auth()
 
-class TestRateLimiting:
-    def test_retry_on_429(self, client):
-        rate_limited = MagicMock()
-        rate_limited.status_code = 429
-        rate_limited.headers = {"Retry-After": "0"}
 
-        success = MagicMock()
-        success.status_code = 200
-        success.json.return_value = {"ok": True}
-        success.raise_for_status = MagicMock()
+PAGINATE_SCENARIOS = {
+    "single": [{"results": [{"id": "1"}, {"id": "2"}], "_links": {}}],
+    "multi": [
+        {"results": [{"id": "1"}], "_links": {"next": "/wiki/api/v2/test?cursor=abc"}},
+        {"results": [{"id": "2"}], "_links": {}},
+    ],
+}
+
 
-        with patch.object(client.session, "request", side_effect=[rate_limited, success]):
-            result = client._get_json("/wiki/api/v2/test")
-            assert result == {"ok": True}
+@pytest.fixture(scope="module")
+def paginate_scenario(request):
+    return [FakeResponse(200, payload) for payload in PAGINATE_SCENARIOS[request.param]]
 
-    def test_retry_on_500(self, client):
-        error = MagicMock()
-        error.status_code = 500
-        error.headers = {}
 
-        success = MagicMock()
-        success.status_code = 200
-        success.json.return_value = {"ok": True}
-        success.raise_for_status = MagicMock()
+class TestPagination:
+    @pytest.mark.parametrize("paginate_scenario", ["single", "multi"], indirect=True)
+    def test_paginate(self, client, session_request, paginate_scenario):
+        session_request.side_effect = paginate_scenario
+        results = list(client._paginate("/wiki/api/v2/test"))
+        assert [r["id"] for r in results] == ["1", "2"]
+        assert session_request.call_count == len(paginate_scenario)
+
 
-        with patch.object(client.session, "request", side_effect=[error, success]):
-            with patch("time.sleep"):  # Skip actual sleep
-                result = client._get_json("/wiki/api/v2/test")
-                assert result == {"ok": True}
+class TestRateLimiting:
+    def test_retry_on_429(self, client, session_request):
+        rate_limited = FakeResponse(429, headers={"Retry-After": "0"})
+        success = FakeResponse(200, {"ok": True})
+
+        session_request.side_effect = [rate_limited, success]
+        result = client._get_json("/wiki/api/v2/test")
+        assert result == {"ok": True}
+
+    def test_retry_on_500(self, client, session_request):
+        error = FakeResponse(500)
+        success = FakeResponse(200, {"ok": True})
+
+        session_request.side_effect = [error, success]
+        result = client._get_json("/wiki/api/v2/test")
+        assert result == {"ok": True}
+
+
+class TestRateLimiter:
+    def test_blocks_when_window_full(self):
+        limiter = _RateLimiter(rpm=2)
+        clock = [0.0]
+
+        def fake_sleep(seconds):
+            clock[0] += seconds
+
+        with patch("migrate.time.monotonic", side_effect=lambda: clock[0]), \
+                patch("migrate.time.sleep", side_effect=fake_sleep) as mock_sleep:
+            for _ in range(3):
+                limiter.wait_if_throttled()
+            mock_sleep.assert_called_once_with(60)
+
+    def test_pauses_when_quota_nearly_exhausted(self):
+        limiter = _RateLimiter(rpm=120)
+        with patch("migrate.time.sleep") as mock_sleep:
+            limiter.observe({"X-RateLimit-Remaining": "50", "X-RateLimit-Limit": "100"})
+            mock_sleep.assert_not_called()
+            limiter.observe({"X-RateLimit-Remaining": "5", "X-RateLimit-Limit": "100"})
+            mock_sleep.assert_called_once_with(0.5)
+
+    def test_rpm_from_env(self, monkeypatch):
+        monkeypatch.setenv("CONFLUENCE_RPM", "42")
+        c = ConfluenceClient("https://test.atlassian.net", "user@test.com", "test-token")
+        assert c.rate_limiter.rpm == 42
+
+    @pytest.mark.parametrize("value", ["60.5", "abc"])
+    def test_invalid_rpm_from_env(self, monkeypatch, value):
+        monkeypatch.setenv("CONFLUENCE_RPM", value)
+        with pytest.raises(click.ClickException, match="CONFLUENCE_RPM must be a whole number"):
+            ConfluenceClient("https://test.atlassian.net", "user@test.com", "test-token")
+
+
+class TestAdaptiveConcurrency:
+    def test_additive_increase_on_healthy_latency(self):
+        ctl = _AdaptiveConcurrency(initial=4)
+        for _ in range(ctl.WINDOW):
+            ctl.acquire()
+            ctl.release(0.1)
+        assert ctl.limit == 5
+
+    def test_multiplicative_decrease_on_throttle(self):
+        ctl = _AdaptiveConcurrency(initial=8)
+        ctl.acquire()
+        ctl.release(0.1, throttled=True)
+        assert ctl.limit == 4
+
+    def test_limit_never_below_minimum(self):
+        ctl = _AdaptiveConcurrency(initial=2, minimum=2)
+        ctl.acquire()
+        ctl.release(0.1, throttled=True)
+        assert ctl.limit == 2
 
 
 class TestDownloadURL:
-    def test_prepend_wiki_to_relative_download(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.content = b"file-data"
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp) as mock_req:
-            client.download_attachment("/download/attachments/123/file.png")
-            # Should have prepended /wiki
-            call_url = mock_req.call_args[0][1]
-            assert call_url.startswith("https://test.atlassian.net/wiki/download/")
-
-    def test_absolute_url_unchanged(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.content = b"file-data"
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp) as mock_req:
-            client.download_attachment("https://cdn.example.com/file.png")
-            call_url = mock_req.call_args[0][1]
-            assert call_url == "https://cdn.example.com/file.png"
+    @pytest.mark.parametrize("url,expected", [
+        # Relative download links get the /wiki context path prepended
+        ("/download/attachments/123/file.png", "https://test.atlassian.net/wiki/download/attachments/123/file.png"),
+        ("https://cdn.example.com/file.png", "https://cdn.example.com/file.png"),
+    ])
+    def test_download_url(self, client, session_request, tmp_path, url, expected):
+        session_request.return_value = FakeResponse(200, chunks=[b"file-data"])
+        client.download_attachment(url, tmp_path / "file.png")
+        assert session_request.call_args[0][1] == expected
+
+    def test_streams_to_disk(self, client, session_request, tmp_path):
+        mock_resp = FakeResponse(200, chunks=[b"file-", b"data"])
+        dest = tmp_path / "file.pdf"
+
+        session_request.return_value = mock_resp
+        size = client.download_attachment("/download/attachments/123/file.pdf", dest)
+        assert session_request.call_args[1]["stream"] is True
+        assert size == 9
+        assert dest.read_bytes() == b"file-data"
+        assert mock_resp.closed
+        assert mock_resp.chunk_size == ConfluenceClient.DOWNLOAD_CHUNK_SIZE
+
+    def test_failed_stream_removes_partial_file(self, client, session_request, tmp_path):
+        def chunks():
+            yield b"part"
+            raise requests.ConnectionError("reset")
+
+        mock_resp = FakeResponse(200, chunks=chunks())
+        dest = tmp_path / "file.pdf"
+
+        session_request.return_value = mock_resp
+        with pytest.raises(requests.ConnectionError):
+            client.download_attachment("/download/attachments/123/file.pdf", dest)
+        assert not dest.exists()
+
+    @pytest.mark.parametrize("fails", [False, True], ids=["redownload", "failed_redownload"])
+    def test_redownload_leaves_hardlinked_copy_alone(self, client, session_request, tmp_path, fails):
+        dest = tmp_path / "file.pdf"
+        dest.write_bytes(b"old-data")
+        converted = tmp_path / "converted.pdf"
+        os.link(dest, converted)  # as Converter.copy_attachments links it
+
+        def chunks():
+            yield b"new-"
+            if fails:
+                raise requests.ConnectionError("reset")
+            yield b"data"
+
+        session_request.return_value = FakeResponse(200, chunks=chunks())
+        if fails:
+            with pytest.raises(requests.ConnectionError):
+                client.download_attachment("/download/attachments/123/file.pdf", dest)
+        else:
+            client.download_attachment("/download/attachments/123/file.pdf", dest)
+            assert dest.read_bytes() == b"new-data"
+        assert converted.read_bytes() == b"old-data"
+        assert not (tmp_path / "file.pdf.part").exists()
 
 
 class TestSpaceResolution:
-    def test_get_space_by_key(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.json.return_value = {
-            "results": [{"id": "100", "key": "TEAM", "name": "Team Space"}]
-        }
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp):
-            space = client.get_space_by_key("TEAM")
-            assert space["key"] == "TEAM"
-
-    def test_space_not_found_raises(self, client):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.json.return_value = {"results": []}
-        mock_resp.raise_for_status = MagicMock()
-
-        with patch.object(client.session, "request", return_value=mock_resp):
-            with pytest.raises(click.ClickException, match="not found"):
-                client.get_space_by_key("NOPE")
+    def test_get_space_by_key(self, client, session_request):
+        mock_resp = FakeResponse(200, {"results": [{"id": "100", "key": "TEAM", "name": "Team Space"}]})
+
+        session_request.return_value = mock_resp
+        space = client.get_space_by_key("TEAM")
+        assert space["key"] == "TEAM"
+
+    def test_space_not_found_raises(self, client, session_request):
+        mock_resp = FakeResponse(200, {"results": []})
+
+        session_request.return_value = mock_resp
+        with pytest.raises(click.ClickException, match="not found"):
+            client.get_space_by_key("NOPE")
+
+
+class TestSession:
+    def test_close_releases_session(self, client):
+        with patch.object(client.session, "close") as mock_close:
+            client.close()
+            mock_close.assert_called_once()
+
+    def test_pool_sized_for_workers(self, client):
+        adapter = client.session.get_adapter("https://test.atlassian.net")
+        assert adapter._pool_maxsize == ConfluenceClient.MAX_WORKERS
+
+    def test_default_timeout(self, client, session_request):
+        mock_resp = FakeResponse(200, {})
+        session_request.return_value = mock_resp
+        client._get_json("/wiki/api/v2/test")
+        assert session_request.call_args[1]["timeout"] == ConfluenceClient.TIMEOUT
+
+
+class TestConditionalGet:
+    def test_sends_if_none_match_and_handles_304(self, client, session_request):
+        mock_resp = FakeResponse(304)  # no body: json() would raise
+
+        session_request.return_value = mock_resp
+        assert client.get_page("42", etag='"v3"') is None
+        assert session_request.call_args[1]["headers"] == {"If-None-Match": '"v3"'}
+
+    def test_keeps_response_etag(self, client, session_request):
+        mock_resp = FakeResponse(200, {"id": "42", "title": "Page"}, headers={"ETag": '"v4"'})
+
+        session_request.return_value = mock_resp
+        page = client.get_page("42")
+        assert page["etag"] == '"v4"'
+        assert session_request.call_args[1]["headers"] is None
+
+    def test_space_pages_mark_unchanged(self, client):
+        listed = [{"id": "1", "title": "Old"}, {"id": "2", "title": "New"}]
+        with patch.object(client, "_paginate", return_value=iter(listed)), \
+                patch.object(client, "get_page",
+                             side_effect=lambda pid, etag=None: None if etag else {"id": pid}):
+            pages = client.get_space_pages("space", etags={"1": '"v1"'})
+        assert pages[0] == {"id": "1", "title": "Old", "not_modified": True}
+        assert pages[1] == {"id": "2"}
+
+
+class TestSpaceKeyCache:
+    def test_lookup_cached(self, client):
+        with patch.object(client, "_get_json", return_value={"key": "ENG"}) as mock_get:
+            assert client.get_space_key(123) == "ENG"
+            assert client.get_space_key("123") == "ENG"
+            assert mock_get.call_count == 1
+
+    def test_seeded_keys_skip_http(self, client):
+        client.remember_space_keys({"9": "DOCS"})
+        with patch.object(client, "_get_json") as mock_get:
+            assert client.get_space_key("9") == "DOCS"
+            mock_get.assert_not_called()
+
+    def test_failure_falls_back_to_id_uncached(self, client):
+        with patch.object(client, "_get_json", side_effect=[RuntimeError("down"), {"key": "ENG"}]):
+            assert client.get_space_key("5") == "5"
+            assert client.get_space_key("5") == "ENG"
+
+    def test_bulk_resolution_dedupes_and_skips_cached(self, client):
+        client.remember_space_keys({"1": "OPS"})
+
+        def fake_get(path):
+            return {"key": "K" + path.rsplit("/", 1)[-1]}
+
+        with patch.object(client, "_get_json", side_effect=fake_get) as mock_get:
+            keys = client.get_space_keys(["2", 1, "3", "2"])
+        assert keys == {"2": "K2", "1": "OPS", "3": "K3"}
+        assert list(keys) == ["2", "1", "3"]
+        assert mock_get.call_count == 2
+
+
+class TestBulkListings:
+    def test_footer_comments_grouped_without_replies(self, client):
+        comments = [
+            {"id": "c1", "pageId": "1"},
+            {"id": "c2", "pageId": "1", "parentCommentId": "c1"},
+            {"id": "c3", "pageId": "2"},
+            {"id": "c4", "blogPostId": "7"},
+        ]
+        with patch.object(client, "_paginate", return_value=iter(comments)) as mock_pag:
+            by_page = client.get_all_footer_comments()
+        assert by_page == {"1": [comments[0]], "2": [comments[2]]}
+        assert mock_pag.call_args[1]["limit"] == ConfluenceClient.BULK_LIMIT
+
+    def test_attachments_grouped(self, client):
+        atts = [{"title": "a.png", "pageId": 1}, {"title": "b.pdf", "pageId": "1"}]
+        with patch.object(client, "_paginate", return_value=iter(atts)):
+            assert client.get_all_attachments() == {"1": atts}
+
+
+class TestAuthHeader:
+    def test_basic_auth_precomputed(self, client):
+        import base64
+
+        expected = base64.b64encode(b"user@test.com:test-token").decode()
+        req = requests.Request("GET", "https://test.atlassian.net/wiki")
+        prepared = client.session.prepare_request(req)
+        assert prepared.headers["Authorization"] == f"Basic {expected}"
+        assert "Authorization" not in client.session.headers
+
+
+class TestParallelPageFetch:
+    def test_get_pages_by_ids_preserves_order(self, client):
+        with patch.object(client, "get_page", side_effect=lambda pid, etag=None: {"id": pid}) as mock_get:
+            pages = client.get_pages_by_ids(["3", "1", "2"])
+            assert [p["id"] for p in pages] == ["3", "1", "2"]
+            assert mock_get.call_count == 3
@@ -1,44 +1,202 @@
 """Tests for Converter — the critical test file for HTML edge cases."""
 
 import json
+import re
+import sys
+import threading
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
-from migrate import Converter
+from bs4 import BeautifulSoup
 
+from migrate import Converter, MigrationState, file_ext
 
-@pytest.fixture
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_converter():
+    """Run one page through the pipeline first, so lxml, the bs4 tree builder and this
+    thread's html2text instance are initialized before the first timed test."""
+    Converter().convert_page({
+        "body": '<p>warm</p><table><tr><th><h1>x</h1></th></tr></table>'
+                '<div class="confluence-information-macro confluence-information-macro-info"></div>',
+        "comments": [],
+        "attachments": [],
+    })
+
+
+@pytest.fixture(scope="module")
 def converter():
     return Converter()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def converter_no_images():
     return Converter(exclude_images=True)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def converter_no_attachments():
     return Converter(exclude_attachments=True)
 
 
 # -- Preprocessing tests ---------------------------------------------------
 
+# (html, substrings the result must contain, substrings it must not contain)
+PREPROCESS_CASES = [
+    pytest.param(
+        '<table><tr><th><h3>Header</h3></th></tr></table>',
+        ["<strong>", "Header"], ["<h3>"],
+        id="h3_in_th_becomes_strong",
+    ),
+    pytest.param(
+        '<table><tr><td><h2>Cell Title</h2></td></tr></table>',
+        ["<strong>"], ["<h2>"],
+        id="h2_in_td_becomes_strong",
+    ),
+    pytest.param(
+        '<p>Content</p><div class="plugin_attachments_container"><h2>Attachments</h2></div>',
+        ["Content"], ["plugin_attachments_container"],
+        id="remove_plugin_attachments_container",
+    ),
+    pytest.param(
+        '<div class="plugin_attachments_container"><table><tr>'
+        '<td colspan="2"><img src="/download/attachments/1/a.png" /></td>'
+        '</tr></table></div><p>Body</p>',
+        ["Body"], ["<img", "<td"],
+        id="container_contents_not_processed",
+    ),
+    pytest.param(
+        '<img src="/download/attachments/12345/logo.png?version=1" alt="Logo" />',
+        ['src="logo.png"'], [],
+        id="rewrite_attachment_image_url",
+    ),
+    pytest.param(
+        '<img src="/wiki/rest/api/content/123/child/attachment/456/download/photo.jpg" />',
+        ['src="photo.jpg"'], [],
+        id="rewrite_url_with_path_segments",
+    ),
+    pytest.param(
+        '<img src="data:image/png;base64,abc123" />',
+        ["data:image/png;base64"], [],
+        id="data_uri_images_unchanged",
+    ),
+    pytest.param(
+        '<img src="/download/attachments/1/my%20logo.png" />',
+        ['src="my%20logo.png"'], [],
+        id="encoded_image_name_round_trips",
+    ),
+    pytest.param(
+        '<p>Demo</p><img src="/download/attachments/1/clip.mp4" />',
+        ["Demo"], ["<img", "clip.mp4"],
+        id="non_image_embed_removed",
+    ),
+    *(
+        pytest.param(
+            f'<div class="confluence-information-macro confluence-information-macro-{variant}">'
+            f'<div class="confluence-information-macro-body"><p>{text}</p></div></div>',
+            ["<blockquote>"] + ([label] if label else []), [],
+            id=f"{variant}_panel",
+        )
+        for variant, label, text in [
+            ("information", "Info", "Info text"),
+            ("warning", "Warning", "Danger!"),
+            ("note", None, "Remember this."),
+            ("tip", "Tip", "Pro tip!"),
+        ]
+    ),
+    pytest.param(
+        '<div class="code-block" data-language="java"><pre>System.out.println("hi");</pre></div>',
+        ['class="language-java"', "System.out.println"], [],
+        id="code_block_with_language",
+    ),
+    pytest.param(
+        '<div class="code-block"><pre>some code</pre></div>',
+        ["<pre>", "some code"], [],
+        id="code_block_without_language",
+    ),
+    pytest.param(
+        '<ac:structured-macro ac:name="jira"><ac:parameter ac:name="key">PROJ-1</ac:parameter></ac:structured-macro>',
+        ["Unsupported macro: jira"], [],
+        id="unsupported_structured_macro",
+    ),
+    pytest.param(
+        '<div data-macro-name="drawio"><p>diagram</p></div>',
+        ["Unsupported macro: drawio"], [],
+        id="data_macro_name_div",
+    ),
+    # Info panels and code blocks carry data-macro-name too, but have their own passes
+    pytest.param(
+        '''<div class="confluence-information-macro confluence-information-macro-information" data-macro-name="info">
+            <div class="confluence-information-macro-body"><p>Info</p></div>
+        </div>''',
+        ["<blockquote>"], ["Unsupported macro"],
+        id="info_panel_not_double_processed_as_macro",
+    ),
+    pytest.param(
+        '''<div class="code panel pdl code-block" data-macro-name="code" data-language="python">
+            <pre>print(1)</pre>
+        </div>''',
+        ['class="language-python"'], ["Unsupported macro"],
+        id="code_block_not_double_processed_as_macro",
+    ),
+    pytest.param(
+        '<div class="code-block-wrapper" data-macro-name="code"><pre>x = 1</pre></div>',
+        ["x = 1"], ["Unsupported macro"],
+        id="code_block_wrapper_not_commented_out",
+    ),
+    pytest.param(
+        '<div class="confluence-information-macro-warning" data-macro-name="warning"><p>Careful</p></div>',
+        ["Careful"], ["Unsupported macro"],
+        id="bare_panel_class_not_commented_out",
+    ),
+    pytest.param(
+        '<a class="confluence-userlink" href="/wiki/people/abc">Jane Doe</a>',
+        ["@Jane Doe"], ["<a"],
+        id="user_mention_replaced",
+    ),
+    pytest.param(
+        '<!-- kept --><title>Page title</title><p>Body</p>',
+        ["<!-- kept -->", "<title>Page title</title>", "<p>Body</p>"], ["<html", "<body"],
+        id="only_html_body_wrapper_trimmed",
+    ),
+]
+
+
+@pytest.mark.parametrize("html,present,absent", PREPROCESS_CASES)
+def test_preprocess(converter, html, present, absent):
+    result = converter.preprocess_html(html)
+    for text in present:
+        assert text in result
+    for text in absent:
+        assert text not in result
+
+
+# Same shape, run with --exclude-images
+PREPROCESS_NO_IMAGES_CASES = [
+    pytest.param(
+        '<p>Text</p><img src="/download/attachments/1/img.png" /><p>More</p>',
+        ["Text", "More"], ["<img"],
+        id="exclude_images_removes_tags",
+    ),
+    pytest.param(
+        '<p>Inline</p><img src="data:image/png;base64,abc123" />',
+        ["Inline"], ["<img", "base64"],
+        id="exclude_images_removes_data_uris",
+    ),
+]
+
+
+@pytest.mark.parametrize("html,present,absent", PREPROCESS_NO_IMAGES_CASES)
+def test_preprocess_without_images(converter_no_images, html, present, absent):
+    result = converter_no_images.preprocess_html(html)
+    for text in present:
+        assert text in result
+    for text in absent:
+        assert text not in result
 
-class TestPreprocessTableHeaders:
-    def test_h3_in_th_becomes_strong(self, converter):
-        html = '<table><tr><th><h3>Header</h3></th></tr></table>'
-        result = converter.preprocess_html(html)
-        assert "<h3>" not in result
-        assert "<strong>" in result
-        assert "Header" in result
-
-    def test_h2_in_td_becomes_strong(self, converter):
-        html = '<table><tr><td><h2>Cell Title</h2></td></tr></table>'
-        result = converter.preprocess_html(html)
-        assert "<h2>" not in result
-        assert "<strong>" in result
 
+class TestPreprocessTableHeaders:
     def test_multiple_headings_in_table(self, converter):
         html = '''<table>
             <tr><th><h1>A</h1></th><th><h6>B</h6></th></tr>
@@ -51,8 +209,7 @@ class TestPreprocessTableHeaders:
 
     def test_complex_table_fixture(self, converter, sample_tables_html):
         result = converter.preprocess_html(sample_tables_html)
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(result, "html.parser")
+        soup = BeautifulSoup(result, "lxml")
         # Headings inside table cells should be replaced with <strong>
         for cell in soup.find_all(["th", "td"]):
             assert cell.find(["h1", "h2", "h3", "h4", "h5", "h6"]) is None
@@ -60,116 +217,17 @@ class TestPreprocessTableHeaders:
 
 
 class TestPreprocessAttachmentContainer:
-    def test_remove_plugin_attachments_container(self, converter):
-        html = '<p>Content</p><div class="plugin_attachments_container"><h2>Attachments</h2></div>'
-        result = converter.preprocess_html(html)
-        assert "plugin_attachments_container" not in result
-        assert "Content" in result
-
     def test_sample_page_removes_container(self, converter, sample_page_html):
         result = converter.preprocess_html(sample_page_html)
         assert "plugin_attachments_container" not in result
 
 
-class TestPreprocessImageUrls:
-    def test_rewrite_attachment_image_url(self, converter):
-        html = '<img src="/download/attachments/12345/logo.png?version=1" alt="Logo" />'
-        result = converter.preprocess_html(html)
-        assert 'src="logo.png"' in result
-
-    def test_rewrite_url_with_path_segments(self, converter):
-        html = '<img src="/wiki/rest/api/content/123/child/attachment/456/download/photo.jpg" />'
-        result = converter.preprocess_html(html)
-        assert 'src="photo.jpg"' in result
-
-    def test_exclude_images_removes_tags(self, converter_no_images):
-        html = '<p>Text</p><img src="/download/attachments/1/img.png" /><p>More</p>'
-        result = converter_no_images.preprocess_html(html)
-        assert "<img" not in result
-        assert "Text" in result
-        assert "More" in result
-
-    def test_data_uri_images_unchanged(self, converter):
-        html = '<img src="data:image/png;base64,abc123" />'
-        result = converter.preprocess_html(html)
-        assert "data:image/png;base64" in result
-
-
-class TestPreprocessPanels:
-    def test_info_panel(self, converter):
-        html = '''<div class="confluence-information-macro confluence-information-macro-information">
-            <div class="confluence-information-macro-body"><p>Info text</p></div>
-        </div>'''
-        result = converter.preprocess_html(html)
-        assert "<blockquote>" in result
-        assert "Info" in result
-
-    def test_warning_panel(self, converter):
-        html = '''<div class="confluence-information-macro confluence-information-macro-warning">
-            <div class="confluence-information-macro-body"><p>Danger!</p></div>
-        </div>'''
-        result = converter.preprocess_html(html)
-        assert "<blockquote>" in result
-        assert "Warning" in result
-
-    def test_note_panel(self, converter):
-        html = '''<div class="confluence-information-macro confluence-information-macro-note">
-            <div class="confluence-information-macro-body"><p>Remember this.</p></div>
-        </div>'''
-        result = converter.preprocess_html(html)
-        assert "<blockquote>" in result
-
-    def test_tip_panel(self, converter):
-        html = '''<div class="confluence-information-macro confluence-information-macro-tip">
-            <div class="confluence-information-macro-body"><p>Pro tip!</p></div>
-        </div>'''
-        result = converter.preprocess_html(html)
-        assert "<blockquote>" in result
-        assert "Tip" in result
-
-
-class TestPreprocessCodeBlocks:
-    def test_code_block_with_language(self, converter):
-        html = '<div class="code-block" data-language="java"><pre>System.out.println("hi");</pre></div>'
-        result = converter.preprocess_html(html)
-        assert 'class="language-java"' in result
-        assert "System.out.println" in result
-
-    def test_code_block_without_language(self, converter):
-        html = '<div class="code-block"><pre>some code</pre></div>'
-        result = converter.preprocess_html(html)
-        assert "<pre>" in result
-        assert "some code" in result
-
-
 class TestPreprocessMacros:
-    def test_unsupported_structured_macro(self, converter):
-        html = '<ac:structured-macro ac:name="jira"><ac:parameter ac:name="key">PROJ-1</ac:parameter></ac:structured-macro>'
-        result = converter.preprocess_html(html)
-        assert "Unsupported macro: jira" in result
-
-    def test_data_macro_name_div(self, converter):
-        html = '<div data-macro-name="drawio"><p>diagram</p></div>'
-        result = converter.preprocess_html(html)
-        assert "Unsupported macro: drawio" in result
-
-    def test_info_panel_not_double_processed_as_macro(self, converter):
-        """Info panels have data-macro-name but should be handled as panels, not generic macros."""
-        html = '''<div class="confluence-information-macro confluence-information-macro-information" data-macro-name="info">
-            <div class="confluence-information-macro-body"><p>Info</p></div>
-        </div>'''
-        result = converter.preprocess_html(html)
-        # Should be a blockquote, not an unsupported macro comment
-        assert "<blockquote>" in result
-        assert "Unsupported macro" not in result
-
-
-class TestPreprocessUserMentions:
-    def test_user_mention_replaced(self, converter):
-        html = '<a class="confluence-userlink" href="/wiki/people/abc">Jane Doe</a>'
+    def test_mixed_macros_in_one_page(self, converter):
+        html = ('<div data-macro-name="drawio"><p>d</p></div>'
+                '<ac:structured-macro ac:name="jira"></ac:structured-macro>')
         result = converter.preprocess_html(html)
-        assert "@Jane Doe" in result
-        assert "<a" not in result
+        assert result.index("drawio") < result.index("jira")
 
 
 # -- Full conversion tests -------------------------------------------------
@@ -189,8 +247,46 @@ class TestHtmlToMarkdown:
         lines = [l for l in md.split("\n") if l.strip()]
         assert len(lines) == 1
 
+    def test_html2text_instance_per_thread(self, converter):
+        main = converter._get_h2t()
+        assert converter._get_h2t() is main
+        other = []
+        t = threading.Thread(target=lambda: other.append(converter._get_h2t()))
+        t.start()
+        t.join()
+        assert other[0] is not main
+
+    def test_html2text_shared_across_converters(self, converter):
+        h2t = Converter()._get_h2t()
+        assert h2t is converter._get_h2t()
+        assert h2t.body_width == 0 and h2t.pad_tables
+
 
 class TestConvertPage:
+    @pytest.mark.parametrize("page_data,present,absent", [
+        pytest.param(
+            {"body": "<p>Simple page</p>", "comments": [], "attachments": []},
+            ["Simple page"], ["## Comments", "## Attachments"],
+            id="no_comments_or_attachments",
+        ),
+        pytest.param(
+            {"body": "<p>Pics</p>", "comments": [], "attachments": [{"title": "a.png"}]},
+            ["Pics"], ["## Attachments"],
+            id="image_attachments_not_listed",
+        ),
+        pytest.param(
+            {"body": "<p>Files</p>", "comments": [], "attachments": [{"title": "spec.pdf"}]},
+            ["Files", "## Attachments", "spec.pdf"], ["## Comments"],
+            id="file_attachments_listed",
+        ),
+    ])
+    def test_sections(self, converter, page_data, present, absent):
+        md = converter.convert_page(page_data)
+        for text in present:
+            assert text in md
+        for text in absent:
+            assert text not in md
+
     def test_full_page_conversion(self, converter, sample_page_data):
         md = converter.convert_page(sample_page_data)
         # Should contain markdown content
@@ -202,24 +298,16 @@ class TestConvertPage:
         assert "## Attachments" in md
         assert "document.pdf" in md
 
-    def test_page_without_comments(self, converter):
-        page_data = {
-            "body": "<p>Simple page</p>",
-            "comments": [],
-            "attachments": [],
-        }
-        md = converter.convert_page(page_data)
-        assert "Simple page" in md
-        assert "## Comments" not in md
+    def test_empty_body_skips_parsing(self, converter):
+        page_data = {"body": "", "comments": [], "attachments": [{"title": "doc.pdf"}]}
+        with patch.object(converter, "preprocess_html") as mock_pre:
+            md = converter.convert_page(page_data)
+            mock_pre.assert_not_called()
+        assert md.strip().startswith("## Attachments")
 
-    def test_page_without_attachments(self, converter):
-        page_data = {
-            "body": "<p>Content</p>",
-            "comments": [],
-            "attachments": [],
-        }
-        md = converter.convert_page(page_data)
-        assert "## Attachments" not in md
+    def test_preprocess_returns_body_fragment(self, converter):
+        result = converter.preprocess_html("<p>Only body</p>")
+        assert result == "<p>Only body</p>"
 
     def test_exclude_attachments(self, converter_no_attachments):
         page_data = {
@@ -286,152 +374,80 @@ class TestGenerateAttachmentSection:
 
 
 class TestSanitizeFilename:
-    def test_strip_unsafe_chars(self, converter):
-        assert converter.sanitize_filename('file/name:with*bad?"chars') == "filenamewithbadchars"
-
-    def test_cap_200_chars(self, converter):
-        name = "a" * 300
-        assert len(converter.sanitize_filename(name)) == 200
-
-    def test_empty_becomes_untitled(self, converter):
-        assert converter.sanitize_filename("***") == "untitled"
-
-    def test_dedupe_with_suffix(self, converter):
-        existing = {"report", "report-2"}
-        result = converter.sanitize_filename("report", existing)
-        assert result == "report-3"
+    @pytest.mark.parametrize("name,existing,expected", [
+        pytest.param('file/name:with*bad?"chars', None, "filenamewithbadchars", id="strip_unsafe_chars"),
+        pytest.param("a" * 300, None, "a" * 200, id="cap_200_chars"),
+        pytest.param("***", None, "untitled", id="empty_becomes_untitled"),
+        pytest.param("report", {"report", "report-2"}, "report-3", id="dedupe_with_suffix"),
+        pytest.param("report", {"other"}, "report", id="no_collision"),
+        pytest.param("  name  ", None, "name", id="whitespace_stripped"),
+        pytest.param("a|b<c>d", None, "abcd", id="pipe_and_angle_brackets"),
+    ])
+    def test_sanitize(self, converter, name, existing, expected):
+        args = (name,) if existing is None else (name, existing)
+        assert converter.sanitize_filename(*args) == expected
+
+    def test_dedupe_counters_resume(self, converter):
+        existing = {"report"}
+        counters = {}
+        for expected in ("report-2", "report-3", "report-4"):
+            name = converter.sanitize_filename("report", existing, counters)
+            assert name == expected
+            existing.add(name)
+        assert counters["report"] == 5
 
-    def test_no_collision(self, converter):
-        existing = {"other"}
-        result = converter.sanitize_filename("report", existing)
-        assert result == "report"
 
-    def test_whitespace_stripped(self, converter):
-        assert converter.sanitize_filename("  name  ") == "name"
-
-    def test_pipe_and_angle_brackets(self, converter):
-        assert converter.sanitize_filename("a|b<c>d") == "abcd"
+# -- Output tree building -------------------------------------------------
 
 
-# -- Output tree building -------------------------------------------------
+def _page(pid, title, parent_id=None, has_children=False):
+    """An exported page record as build_output_tree() reads it."""
+    return {
+        "page_id": pid,
+        "title": title,
+        "space_key": "SP",
+        "parent_id": parent_id,
+        "has_children": has_children,
+        "status": "exported",
+    }
 
 
 class TestBuildOutputTree:
     def _make_state(self, pages_data, tmp_path):
         """Helper to create a MigrationState with test pages."""
-        from migrate import MigrationState
-
-        state = MigrationState(path=tmp_path / ".migration-state.json")
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
         for p in pages_data:
             state.set_page(p["page_id"], p)
         return state
 
-    def test_single_page_is_readme(self, converter, tmp_path):
-        state = self._make_state(
+    @pytest.mark.parametrize("pages,expected_paths", [
+        pytest.param(
+            [_page("1", "Home")],
+            {"1": "Readme.md"},
+            id="single_page_is_readme",
+        ),
+        pytest.param(
+            [_page("1", "Home", has_children=True), _page("2", "Child Page", "1")],
+            {"1": "Readme.md", "2": "Child Page.md"},
+            id="parent_child_structure",
+        ),
+        pytest.param(
             [
-                {
-                    "page_id": "1",
-                    "title": "Home",
-                    "space_key": "SP",
-                    "parent_id": None,
-                    "has_children": False,
-                    "status": "exported",
-                }
+                _page("1", "Root", has_children=True),
+                _page("2", "Section", "1", has_children=True),
+                _page("3", "Leaf", "2"),
             ],
-            tmp_path,
-        )
-        tree = converter.build_output_tree(state)
-        assert tree["1"]["path"] == "Readme.md"
-
-    def test_parent_child_structure(self, converter, tmp_path):
-        state = self._make_state(
-            [
-                {
-                    "page_id": "1",
-                    "title": "Home",
-                    "space_key": "SP",
-                    "parent_id": None,
-                    "has_children": True,
-                    "status": "exported",
-                },
-                {
-                    "page_id": "2",
-                    "title": "Child Page",
-                    "space_key": "SP",
-                    "parent_id": "1",
-                    "has_children": False,
-                    "status": "exported",
-                },
-            ],
-            tmp_path,
-        )
-        tree = converter.build_output_tree(state)
-        assert tree["1"]["path"] == "Readme.md"
-        assert tree["2"]["path"] == "Child Page.md"
-
-    def test_nested_hierarchy(self, converter, tmp_path):
-        state = self._make_state(
-            [
-                {
-                    "page_id": "1",
-                    "title": "Root",
-                    "space_key": "SP",
-                    "parent_id": None,
-                    "has_children": True,
-                    "status": "exported",
-                },
-                {
-                    "page_id": "2",
-                    "title": "Section",
-                    "space_key": "SP",
-                    "parent_id": "1",
-                    "has_children": True,
-                    "status": "exported",
-                },
-                {
-                    "page_id": "3",
-                    "title": "Leaf",
-                    "space_key": "SP",
-                    "parent_id": "2",
-                    "has_children": False,
-                    "status": "exported",
-                },
-            ],
-            tmp_path,
-        )
-        tree = converter.build_output_tree(state)
-        assert tree["1"]["path"] == "Readme.md"
-        assert tree["2"]["path"] == "Section/Readme.md"
-        assert tree["3"]["path"] == "Section/Leaf.md"
+            {"1": "Readme.md", "2": "Section/Readme.md", "3": "Section/Leaf.md"},
+            id="nested_hierarchy",
+        ),
+    ])
+    def test_paths(self, converter, tmp_path, pages, expected_paths):
+        tree = converter.build_output_tree(self._make_state(pages, tmp_path))
+        assert {pid: info["path"] for pid, info in tree.items()} == expected_paths
 
     def test_name_collision_deduped(self, converter, tmp_path):
         state = self._make_state(
-            [
-                {
-                    "page_id": "1",
-                    "title": "Root",
-                    "space_key": "SP",
-                    "parent_id": None,
-                    "has_children": True,
-                    "status": "exported",
-                },
-                {
-                    "page_id": "2",
-                    "title": "Report",
-                    "space_key": "SP",
-                    "parent_id": "1",
-                    "has_children": False,
-                    "status": "exported",
-                },
-                {
-                    "page_id": "3",
-                    "title": "Report",
-                    "space_key": "SP",
-                    "parent_id": "1",
-                    "has_children": False,
-                    "status": "exported",
-                },
-            ],
+            [_page("1", "Root", has_children=True), _page("2", "Report", "1"), _page("3", "Report", "1")],
             tmp_path,
         )
         tree = converter.build_output_tree(state)
@@ -440,25 +456,56 @@ class TestBuildOutputTree:
         assert "Report.md" in paths
         assert "Report-2.md" in paths
 
-    def test_empty_state(self, converter, tmp_path):
-        from migrate import MigrationState
+    def test_deep_hierarchy_no_recursion_limit(self, converter, tmp_path):
+        depth = sys.getrecursionlimit() + 100
+        pages = [
+            _page(str(i), f"Level {i}", str(i - 1) if i else None, has_children=i < depth - 1)
+            for i in range(depth)
+        ]
+        state = self._make_state(pages, tmp_path)
+        tree = converter.build_output_tree(state)
+        assert len(tree) == depth
+        assert tree["1"]["path"] == "Level 1/Readme.md"
+        assert tree["3"]["dir"] == "Level 1/Level 2/Level 3"
 
-        state = MigrationState(path=tmp_path / ".migration-state.json")
+    def test_empty_state(self, converter, tmp_path):
+        state = MigrationState(path=tmp_path / ".migration-state.json", autosave=False)
         tree = converter.build_output_tree(state)
         assert tree == {}
 
 
+# -- Attachment copying ---------------------------------------------------
+
+
+class TestCopyAttachments:
+    def test_hardlinks_and_reruns(self, converter, tmp_path):
+        src_dir = tmp_path / "export"
+        dest_dir = tmp_path / "convert"
+        src_dir.mkdir()
+        (src_dir / "doc.pdf").write_bytes(b"pdf-bytes")
+        page_data = {"attachments": [{"title": "doc.pdf"}, {"title": "missing.png"}]}
+
+        assert converter.copy_attachments(page_data, src_dir, dest_dir) == ["doc.pdf"]
+        # Second run over existing output must not fail
+        assert converter.copy_attachments(page_data, src_dir, dest_dir) == ["doc.pdf"]
+
+        dest = dest_dir / "doc.pdf"
+        assert dest.read_bytes() == b"pdf-bytes"
+        assert dest.stat().st_ino == (src_dir / "doc.pdf").stat().st_ino
+
+
 # -- Integration: full HTML to final MD ------------------------------------
 
+# An opening HTML tag; <!-- comments --> left for unsupported macros don't match
+HTML_TAG_RE = re.compile(r"<(?!!)(?!/!)[a-zA-Z][^>]*>")
+
 
 class TestFullConversion:
     def test_sample_page_produces_clean_markdown(self, converter, sample_page_data):
         md = converter.convert_page(sample_page_data)
 
         # No raw HTML should remain (except HTML comments for unsupported macros)
-        import re
-
-        html_tags = re.findall(r"<(?!!)(?!/!)[a-zA-Z][^>]*>", md)
+        html_tags = HTML_TAG_RE.findall(md)
         assert html_tags == [], f"Raw HTML tags found in output: {html_tags}"
 
         # Key content preserved
@@ -479,3 +526,11 @@ class TestFullConversion:
         assert "API Gateway" in md
         # No block-level headings should remain in table
         assert "<h2>" not in md
+
+
+class TestFileExt:
+    @pytest.mark.parametrize("name", [
+        "a.PNG", "noext", ".bashrc", "name.", "a.tar.gz", "dir/x.jpg", "..b", "clip.Mp4", "...",
+    ])
+    def test_matches_path_suffix(self, name):
+        assert file_ext(name) == Path(name).suffix.lower()
@@ -1,15 +1,22 @@
 """Tests for NextcloudClient."""
 
-from unittest.mock import MagicMock, patch, call
+import re
+from unittest.mock import Mock
 
 import click
 import pytest
 
 from migrate import NextcloudClient
 
+from ._stubs import FakeResponse
 
-@pytest.fixture
-def nc():
+AUTH_FAILED_RE = re.compile("authentication failed")
+NOT_FOUND_RE = re.compile("not found")
+UPLOAD_FAILED_RE = re.compile("Upload failed")
+
+
+@pytest.fixture(scope="module")
+def _shared_nc():
     return NextcloudClient(
         "https://cloud.example.com",
         "testuser",
@@ -18,85 +25,203 @@ def nc():
     )
 
 
-class TestVerifyConnection:
-    def test_success(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 207
-        with patch.object(nc.session, "request", return_value=mock_resp):
-            nc.verify_connection()  # Should not raise
-
-    def test_auth_failure(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 401
-        with patch.object(nc.session, "request", return_value=mock_resp):
-            with pytest.raises(click.ClickException, match="authentication failed"):
-                nc.verify_connection()
-
-    def test_not_found(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 404
-        with patch.object(nc.session, "request", return_value=mock_resp):
-            with pytest.raises(click.ClickException, match="not found"):
-                nc.verify_connection()
+@pytest.fixture
+def nc(_shared_nc):
+    """One client (and Session) for the module; only its path caches are per-test."""
+    _shared_nc._mkdir_cache.clear()
+    _shared_nc._exists_cache.clear()
+    return _shared_nc
 
 
-class TestMkdirP:
-    def test_creates_nested_dirs(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 201
+@pytest.fixture
+def session_request(nc, monkeypatch):
+    """Stand-in for nc.session.request (MKCOL, PROPFIND, HEAD); tests set return_value or side_effect."""
+    m = Mock()
+    monkeypatch.setattr(nc.session, "request", m)
+    return m
+
+
+@pytest.fixture
+def session_put(nc, monkeypatch):
+    """Stand-in for nc.session.put, answering 201 unless a test says otherwise."""
+    m = Mock(return_value=FakeResponse(201))
+    monkeypatch.setattr(nc.session, "put", m)
+    return m
+
+
+class TestVerifyConnection:
+    def test_success(self, nc, session_request):
+        session_request.return_value = FakeResponse(207)
+        nc.verify_connection()  # Should not raise
+
+    def test_auth_failure(self, nc, session_request):
+        session_request.return_value = FakeResponse(401)
+        with pytest.raises(click.ClickException, match=AUTH_FAILED_RE):
+            nc.verify_connection()
 
-        with patch.object(nc.session, "request", return_value=mock_resp) as mock_req:
-            nc.mkdir_p("a/b/c")
-            # Should make 3 MKCOL calls
-            assert mock_req.call_count == 3
-            urls = [c[0][1] for c in mock_req.call_args_list]
-            assert urls[0].endswith("/a")
-            assert urls[1].endswith("/a/b")
-            assert urls[2].endswith("/a/b/c")
+    def test_not_found(self, nc, session_request):
+        session_request.return_value = FakeResponse(404)
+        with pytest.raises(click.ClickException, match=NOT_FOUND_RE):
+            nc.verify_connection()
 
-    def test_ignores_405_already_exists(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 405  # Already exists
 
-        with patch.object(nc.session, "request", return_value=mock_resp):
-            nc.mkdir_p("existing/dir")  # Should not raise
+class TestMkdirP:
+    def test_creates_nested_dirs(self, nc, session_request):
+        session_request.return_value = FakeResponse(201)
+        nc.mkdir_p("a/b/c")
+        # Should make 3 MKCOL calls
+        assert session_request.call_count == 3
+        urls = [c[0][1] for c in session_request.call_args_list]
+        assert urls[0].endswith("/a")
+        assert urls[1].endswith("/a/b")
+        assert urls[2].endswith("/a/b/c")
+
+    def test_skips_known_dirs(self, nc, session_request):
+        session_request.return_value = FakeResponse(201)
+        nc.mkdir_p("a/b")
+        nc.mkdir_p("a/b/c")
+        # a and a/b are cached after the first call
+        assert session_request.call_count == 3
+        assert session_request.call_args[0][1].endswith("/a/b/c")
+
+    def test_sibling_reuses_cached_prefixes(self, nc, session_request):
+        session_request.return_value = FakeResponse(201)
+        nc.mkdir_p("a/b/c")
+        assert session_request.call_count == 3
+        nc.mkdir_p("a/b/d")
+        assert session_request.call_count == 4
+        assert session_request.call_args[0][1].endswith("/a/b/d")
+
+    def test_failed_mkcol_not_cached(self, nc, session_request):
+        session_request.return_value = FakeResponse(500)
+        nc.mkdir_p("a")
+        nc.mkdir_p("a")
+        assert session_request.call_count == 2
+
+    def test_success_marks_ancestors(self, nc, session_request):
+        # "a" errors, yet "a/b" is created under it
+        session_request.side_effect = [FakeResponse(500), FakeResponse(201)]
+        nc.mkdir_p("a/b")
+        session_request.reset_mock()
+        nc.mkdir_p("a")
+        nc.mkdir_p("/a/b/")
+        session_request.assert_not_called()
+
+    def test_ignores_405_already_exists(self, nc, session_request):
+        session_request.return_value = FakeResponse(405)  # Already exists
+        nc.mkdir_p("existing/dir")  # Should not raise
 
 
 class TestUploadFile:
-    def test_successful_upload(self, nc, tmp_path):
+    def test_successful_upload(self, nc, session_put, tmp_path):
         test_file = tmp_path / "test.md"
         test_file.write_text("# Hello")
+        nc.upload_file(str(test_file), "MigratedPages/test.md")
+
+    def test_streams_file_with_content_length(self, nc, session_put, tmp_path):
+        test_file = tmp_path / "big.bin"
+        test_file.write_bytes(b"x" * 4096)
+
+        nc.upload_file(str(test_file), "path/big.bin")
+
+        kwargs = session_put.call_args[1]
+        assert kwargs["headers"]["Content-Length"] == "4096"
+        assert hasattr(kwargs["data"], "read")  # file handle, not bytes
+        assert kwargs["data"].closed  # and released once the PUT returns
 
-        mock_resp = MagicMock()
-        mock_resp.status_code = 201
+    def test_handle_closed_when_put_raises(self, nc, session_put, tmp_path):
+        test_file = tmp_path / "big.bin"
+        test_file.write_bytes(b"x")
 
-        with patch.object(nc.session, "put", return_value=mock_resp):
-            nc.upload_file(str(test_file), "MigratedPages/test.md")
+        session_put.side_effect = ConnectionError("reset")
+        with pytest.raises(ConnectionError):
+            nc.upload_file(str(test_file), "path/big.bin")
+        assert session_put.call_args[1]["data"].closed
 
-    def test_upload_failure_raises(self, nc, tmp_path):
+    def test_upload_failure_raises(self, nc, session_put, tmp_path):
         test_file = tmp_path / "test.md"
         test_file.write_text("content")
 
-        mock_resp = MagicMock()
-        mock_resp.status_code = 500
+        session_put.return_value = FakeResponse(500)
+        with pytest.raises(click.ClickException, match=UPLOAD_FAILED_RE):
+            nc.upload_file(str(test_file), "path/test.md")
 
-        with patch.object(nc.session, "put", return_value=mock_resp):
-            with pytest.raises(click.ClickException, match="Upload failed"):
-                nc.upload_file(str(test_file), "path/test.md")
 
+class TestUploadMany:
+    def test_uploads_all_and_reports_failures(self, nc, session_put, tmp_path):
+        items = []
+        for name in ("a.png", "b.png", "bad.png"):
+            (tmp_path / name).write_bytes(b"data")
+            items.append((tmp_path / name, f"dir/{name}"))
 
-class TestExists:
-    def test_exists_true(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 207
-        with patch.object(nc.session, "request", return_value=mock_resp):
-            assert nc.exists("some/path") is True
+        def fake_put(url, **kwargs):
+            return FakeResponse(500 if url.endswith("bad.png") else 201)
+
+        session_put.side_effect = fake_put
+        errors = nc.upload_many(items)
+
+        assert session_put.call_count == 3
+        assert list(errors) == ["dir/bad.png"]
+        assert isinstance(errors["dir/bad.png"], click.ClickException)
 
-    def test_exists_false(self, nc):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 404
-        with patch.object(nc.session, "request", return_value=mock_resp):
-            assert nc.exists("missing/path") is False
+    def test_missing_local_file_reported(self, nc, session_put, tmp_path):
+        (tmp_path / "page.md").write_text("# Page")
+        items = [(tmp_path / "page.md", "dir/page.md"), (tmp_path / "gone.png", "dir/gone.png")]
+
+        errors = nc.upload_many(items, max_workers=1)
+
+        assert session_put.call_count == 1
+        assert isinstance(errors.pop("dir/gone.png"), FileNotFoundError)
+        assert errors == {}
+
+    def test_empty(self, nc):
+        assert nc.upload_many([]) == {}
+
+
+class TestExists:
+    def test_exists_true(self, nc, session_request):
+        session_request.return_value = FakeResponse(200)
+        assert nc.exists("some/path") is True
+        assert session_request.call_args[0][0] == "HEAD"
+
+    def test_falls_back_to_propfind(self, nc, session_request):
+        session_request.side_effect = [FakeResponse(501), FakeResponse(207)]
+        assert nc.exists("some/dir") is True
+        assert [c[0][0] for c in session_request.call_args_list] == ["HEAD", "PROPFIND"]
+
+    def test_exists_false(self, nc, session_request):
+        session_request.return_value = FakeResponse(404)
+        assert nc.exists("missing/path") is False
+
+    def test_hit_cached(self, nc, session_request):
+        session_request.return_value = FakeResponse(200)
+        assert nc.exists("foo") is True
+        assert nc.exists("foo") is True
+        assert session_request.call_count == 1
+
+    def test_miss_rechecked(self, nc, session_request):
+        session_request.return_value = FakeResponse(404)
+        nc.exists("foo")
+        nc.exists("foo")
+        assert session_request.call_count == 2
+
+    def test_uploaded_and_created_paths_known(self, nc, session_request, session_put, tmp_path):
+        test_file = tmp_path / "p.md"
+        test_file.write_text("x")
+        nc.upload_file(str(test_file), "dir/p.md")
+        session_request.return_value = FakeResponse(201)
+        nc.mkdir_p("dir/sub")
+        session_request.reset_mock()
+        assert nc.exists("dir/p.md") and nc.exists("dir/sub/") and nc.exists("dir")
+        session_request.assert_not_called()
+
+
+class TestSession:
+    def test_adapter_pool_and_retries(self, nc):
+        adapter = nc.session.get_adapter("https://cloud.example.com")
+        assert adapter._pool_maxsize == NextcloudClient.POOL_SIZE
+        assert adapter.max_retries.total == 3
+        assert set(adapter.max_retries.status_forcelist) == {502, 503, 504}
 
 
 class TestDavBasePath:
@@ -107,4 +232,10 @@ class TestDavBasePath:
             "pass",
             "Team Notes",
         )
-        assert nc.dav_base == "https://nc.example.com/remote.php/dav/files/alice/Collectives/Team Notes"
+        assert nc.dav_base == "https://nc.example.com/remote.php/dav/files/alice/Collectives/Team%20Notes"
+
+    def test_paths_percent_encoded(self, nc, session_put, tmp_path):
+        test_file = tmp_path / "f.md"
+        test_file.write_text("x")
+        nc.upload_file(str(test_file), "/Team Docs/Q&A #1.md")
+        assert session_put.call_args[0][0] == f"{nc.dav_base}/Team%20Docs/Q%26A%20%231.md"
@@ -1,9 +1,10 @@
 """Tests for MigrationState."""
 
 import json
+from unittest.mock import patch
 
 import pytest
-from migrate import MigrationState
+from migrate import MigrationState, PageRecord
 
 
 class TestMigrationState:
@@ -13,9 +14,10 @@ class TestMigrationState:
     def test_save_and_load(self, tmp_state):
         record = MigrationState.new_page_record("1", "Test Page", "SPACE")
         tmp_state.set_page("1", record)
+        tmp_state.flush()
 
         # Load into fresh instance
-        loaded = MigrationState(path=tmp_state.path).load()
+        loaded = MigrationState(path=tmp_state.path, autosave=False).load()
         assert "1" in loaded.pages
         assert loaded.pages["1"]["title"] == "Test Page"
 
@@ -31,28 +33,45 @@ class TestMigrationState:
         assert rec["comments"] == []
         assert rec["error"] is None
 
-    def test_status_transitions(self, tmp_state):
+    def test_record_item_access(self):
         rec = MigrationState.new_page_record("1", "Page", "SP")
+        assert isinstance(rec, PageRecord)
+        rec.update(status="exported", etag='"v1"')
+        assert rec["status"] == rec.status == "exported"
+        assert rec.get("etag") == '"v1"'
+        assert rec.get("missing", "x") == "x"
+        with pytest.raises(KeyError):
+            rec["missing"] = 1
+        assert "etag" in rec and "error" not in rec  # unset fields count as absent
+
+    def test_plain_dicts_loaded_as_records(self, tmp_state):
+        data = {"page_id": "1", "title": "Page", "space_key": "SP", "removed_field": 1}
+        tmp_state.path.write_text(json.dumps({"1": data}), encoding="utf-8")
+        rec = MigrationState(path=tmp_state.path, autosave=False).load().get_page("1")
+        assert rec == PageRecord(page_id="1", title="Page", space_key="SP")
+
+    @pytest.mark.parametrize("status", ["pending", "exported", "converted", "uploaded"])
+    def test_status_transition(self, tmp_state, status):
+        rec = MigrationState.new_page_record("1", "Page", "SP")
+        rec["status"] = status
         tmp_state.set_page("1", rec)
-        assert tmp_state.get_page("1")["status"] == "pending"
-
-        rec["status"] = "exported"
-        tmp_state.set_page("1", rec)
-        assert tmp_state.get_page("1")["status"] == "exported"
-
-        rec["status"] = "converted"
-        tmp_state.set_page("1", rec)
-        assert tmp_state.get_page("1")["status"] == "converted"
+        assert tmp_state.get_page("1")["status"] == status
 
-        rec["status"] = "uploaded"
-        tmp_state.set_page("1", rec)
-        assert tmp_state.get_page("1")["status"] == "uploaded"
+    def test_status_sequence_moves_index(self, tmp_state):
+        rec = MigrationState.new_page_record("1", "Page", "SP")
+        with tmp_state.bulk():
+            for status in ("pending", "exported", "converted", "uploaded"):
+                rec["status"] = status
+                tmp_state.set_page("1", rec)
+                assert list(tmp_state.get_pages_by_status(status)) == ["1"]
+        assert tmp_state.get_pages_by_status("pending") == {}
 
     def test_get_pages_by_status(self, tmp_state):
-        for i, status in enumerate(["pending", "exported", "exported", "failed"]):
-            rec = MigrationState.new_page_record(str(i), f"Page {i}", "SP")
-            rec["status"] = status
-            tmp_state.set_page(str(i), rec)
+        with tmp_state.bulk():
+            for i, status in enumerate(["pending", "exported", "exported", "failed"]):
+                rec = MigrationState.new_page_record(str(i), f"Page {i}", "SP")
+                rec["status"] = status
+                tmp_state.set_page(str(i), rec)
 
         assert len(tmp_state.get_pages_by_status("exported")) == 2
         assert len(tmp_state.get_pages_by_status("pending")) == 1
@@ -60,13 +79,49 @@ class TestMigrationState:
         assert len(tmp_state.get_pages_by_status("uploaded")) == 0
 
     def test_summary(self, tmp_state):
-        for i, status in enumerate(["exported", "exported", "converted", "failed"]):
+        with tmp_state.bulk():
+            for i, status in enumerate(["exported", "exported", "converted", "failed"]):
+                rec = MigrationState.new_page_record(str(i), f"Page {i}", "SP")
+                rec["status"] = status
+                tmp_state.set_page(str(i), rec)
+
+        summary = tmp_state.summary()
+        assert summary == {"exported": 2, "converted": 1, "failed": 1}
+
+    def test_status_index_follows_in_place_updates(self, tmp_state):
+        rec = MigrationState.new_page_record("1", "Page", "SP")
+        tmp_state.set_page("1", rec)
+        rec["status"] = "exported"  # CLI phases mutate the stored record, then set it again
+        tmp_state.set_page("1", rec)
+
+        assert tmp_state.get_pages_by_status("pending") == {}
+        assert list(tmp_state.get_pages_by_status("exported")) == ["1"]
+        assert tmp_state.summary() == {"exported": 1}
+
+    def test_status_queries_read_the_index(self, tmp_state):
+        rec = MigrationState.new_page_record("1", "Page", "SP")
+        tmp_state.set_page("1", rec)
+        rec["status"] = "exported"  # not yet set_page()'d: queries still see the old status
+        assert tmp_state.summary() == {"pending": 1}
+        assert list(tmp_state.get_pages_by_status("pending")) == ["1"]
+
+    def test_status_index_rebuilt_on_load(self, tmp_state):
+        for i, status in enumerate(["exported", "failed"]):
             rec = MigrationState.new_page_record(str(i), f"Page {i}", "SP")
             rec["status"] = status
             tmp_state.set_page(str(i), rec)
+        tmp_state.flush()
 
-        summary = tmp_state.summary()
-        assert summary == {"exported": 2, "converted": 1, "failed": 1}
+        loaded = MigrationState(path=tmp_state.path, autosave=False).load()
+        assert loaded.summary() == {"exported": 1, "failed": 1}
+        assert list(loaded.get_pages_by_status("failed")) == ["1"]
+
+    def test_space_keys_from_records(self, tmp_state):
+        rec = MigrationState.new_page_record("1", "Page", "ENG")
+        rec["space_id"] = "42"
+        tmp_state.set_page("1", rec)
+        tmp_state.set_page("2", MigrationState.new_page_record("2", "Old", "ENG"))
+        assert tmp_state.space_keys() == {"42": "ENG"}
 
     def test_get_nonexistent_page(self, tmp_state):
         assert tmp_state.get_page("nonexistent") is None
@@ -75,14 +130,62 @@ class TestMigrationState:
         """Verify save uses tmp+rename pattern (file exists after save)."""
         rec = MigrationState.new_page_record("1", "Page", "SP")
         tmp_state.set_page("1", rec)
+        assert not tmp_state.path.exists()  # autosave is off for tmp_state
+        tmp_state.flush()
         assert tmp_state.path.exists()
 
         # Verify it's valid JSON
         data = json.loads(tmp_state.path.read_text(encoding="utf-8"))
         assert "1" in data
 
+    def test_state_file_is_plain_utf8_json(self, tmp_state):
+        rec = MigrationState.new_page_record("1", "Überblick ✓", "SP")
+        tmp_state.set_page("1", rec)
+        tmp_state.flush()
+
+        raw = tmp_state.path.read_bytes()
+        assert "Überblick ✓".encode("utf-8") in raw  # not \u-escaped
+        assert json.loads(raw) == {"1": rec.to_dict()}
+        assert MigrationState(path=tmp_state.path, autosave=False).load().pages == {"1": rec}
+
+    def test_failed_save_keeps_previous_file(self, tmp_state):
+        tmp_state.set_page("1", MigrationState.new_page_record("1", "Page", "SP"))
+        tmp_state.flush()
+        before = tmp_state.path.read_bytes()
+
+        tmp_state.set_page("2", MigrationState.new_page_record("2", "Page 2", "SP"))
+        with patch("migrate.os.fsync", side_effect=OSError("No space left on device")):
+            with pytest.raises(OSError):
+                tmp_state.flush()
+        assert tmp_state.path.read_bytes() == before
+        assert not tmp_state.path.with_suffix(".tmp").exists()
+
+    def test_set_page_batches_writes(self, tmp_state):
+        state = MigrationState(path=tmp_state.path)  # autosave on, as in the CLI
+        state.set_page("1", MigrationState.new_page_record("1", "Page", "SP"))
+        state.set_page("2", MigrationState.new_page_record("2", "Page 2", "SP"))
+        on_disk = json.loads(state.path.read_text(encoding="utf-8"))
+        assert "2" not in on_disk  # second write within FLUSH_INTERVAL is deferred
+
+        state.flush()
+        on_disk = json.loads(state.path.read_text(encoding="utf-8"))
+        assert set(on_disk) == {"1", "2"}
+
+    def test_bulk_writes_once_on_exit(self, tmp_state):
+        with patch.object(tmp_state, "save", wraps=tmp_state.save) as mock_save:
+            with tmp_state.bulk():
+                for i in range(MigrationState.FLUSH_EVERY + 1):
+                    tmp_state.set_page(str(i), MigrationState.new_page_record(str(i), "P", "SP"))
+                with tmp_state.bulk():  # nested blocks defer to the outermost
+                    tmp_state.set_page("x", MigrationState.new_page_record("x", "P", "SP"))
+                assert not tmp_state.path.exists()
+            mock_save.assert_called_once()
+        on_disk = json.loads(tmp_state.path.read_text(encoding="utf-8"))
+        assert len(on_disk) == MigrationState.FLUSH_EVERY + 2
+        assert not tmp_state.path.with_suffix(".tmp").exists()
+
     def test_load_nonexistent_file(self, tmp_path):
         """Loading from non-existent file should give empty state."""
-        state = MigrationState(path=tmp_path / "does-not-exist.json")
+        state = MigrationState(path=tmp_path / "does-not-exist.json", autosave=False)
         state.load()
         assert state.pages == {}